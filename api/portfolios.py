@@ -11,19 +11,54 @@ class handler(BaseHTTPRequestHandler):
             query_params = parse_qs(parsed_path.query)
             
             # Import here to catch import errors gracefully
-            from .utils.portfolio import get_all_portfolios, load_portfolio
+            from .utils.portfolio import (
+                get_all_portfolios, load_portfolio, get_portfolio_summaries, get_portfolio_page, DEFAULT_PAGE_LIMIT
+            )
             
-            if "id" in query_params:
+            view = query_params.get("view", [None])[0]
+            fields = None
+            if "fields" in query_params:
+                fields = [f for f in query_params["fields"][0].split(",") if f]
+                view = "summary"
+            
+            if view == "analytics":
+                from .utils.analytics import get_performance_analytics
+                data = get_performance_analytics()
+            elif view == "summary":
+                if "id" in query_params:
+                    data = get_portfolio_summaries(fields, model_ids=[query_params["id"][0]])[0]
+                else:
+                    data = get_portfolio_summaries(fields)
+            elif "section" in query_params and "id" in query_params:
+                # Cursor-paginated trade_history / research_logs
+                try:
+                    data = get_portfolio_page(
+                        query_params["id"][0],
+                        query_params["section"][0],
+                        limit=query_params.get("limit", [DEFAULT_PAGE_LIMIT])[0],
+                        before=query_params.get("before", [None])[0]
+                    )
+                except ValueError as e:
+                    self.send_response(400)
+                    self.send_header('Content-type', 'application/json')
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    self.wfile.write(json.dumps({"error": str(e)}).encode('utf-8'))
+                    return
+            elif "id" in query_params:
                 model_id = query_params["id"][0]
-                data = load_portfolio(model_id)
+                data = load_portfolio(model_id, readonly=True)
             else:
+                # Serve the precomputed snapshot when the cycle has written one
+                from .utils.leaderboard import load_leaderboard_snapshot
+                snapshot = load_leaderboard_snapshot()
+                if snapshot:
+                    self.send_snapshot(snapshot)
+                    return
                 data = get_all_portfolios()
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(data, default=str).encode('utf-8'))
+            from .utils.responses import send_json
+            send_json(self, data)
             
         except Exception as e:
             # Log the full error for debugging
@@ -42,6 +77,34 @@ class handler(BaseHTTPRequestHandler):
             }
             self.wfile.write(json.dumps(error_response).encode('utf-8'))
     
+    def send_snapshot(self, snapshot):
+        from .utils.leaderboard import etag_matches, SNAPSHOT_CACHE_CONTROL
+        from .utils.responses import negotiate_encoding
+        meta, raw, compressed = snapshot
+        
+        if etag_matches(self.headers.get('If-None-Match'), meta["etag"]):
+            self.send_response(304)
+            self.send_header('ETag', meta["etag"])
+            self.send_header('Cache-Control', SNAPSHOT_CACHE_CONTROL)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        
+        # The snapshot is only pre-compressed with gzip
+        use_gzip = negotiate_encoding(self.headers.get('Accept-Encoding'), available=("gzip",)) == "gzip"
+        body = compressed if use_gzip else raw
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('ETag', meta["etag"])
+        self.send_header('Cache-Control', SNAPSHOT_CACHE_CONTROL)
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
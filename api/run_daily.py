@@ -1,132 +1,364 @@
 from http.server import BaseHTTPRequestHandler
 import json
-import re
+import time
 from datetime import datetime
-from .utils.config import MODELS
-from .utils.portfolio import load_portfolio, save_portfolio, log_trade, save_research_log, update_nav
-from .utils.research import (
-    get_price, get_financials, get_ratios, get_price_history, 
-    get_insider_activity, get_institutional_holders, get_recommendations, 
-    get_sec_filing, screen_stocks
+from .utils.config import MODELS, MODEL_WORKERS, MODEL_DEADLINE_SECONDS, MODEL_RSS_LIMIT_MB
+from .utils.portfolio import (
+    load_portfolio, save_portfolio, log_trades, save_research_log, update_nav, calculate_cash_balance
 )
-from .utils.alpaca import execute_trade, get_alpaca_portfolio
-from .utils.llm import call_openrouter
+from .utils.leaderboard import write_leaderboard_snapshot
+from .utils.validation import build_book
+from .utils import llm, events
+from .utils.llm import call_openrouter, call_openrouter_json
+from .utils.decisions import DECISION_SCHEMA, extract_decision, validate_decision
+from .utils.events import emit
+from .utils.tracing import span, start_trace, write_trace, trace_origin, collect_spans, add_spans
+from .utils.checkpoint import load_checkpoint, mark, reached
 from .utils.prompts import SYSTEM_PROMPT, RESEARCH_TOOLS_SCHEMA
 
-# Tool Map
-TOOL_MAP = {
-    "get_price": get_price,
-    "get_financials": get_financials,
-    "get_ratios": get_ratios,
-    "get_price_history": get_price_history,
-    "get_insider_activity": get_insider_activity,
-    "get_institutional_holders": get_institutional_holders,
-    "get_recommendations": get_recommendations,
-    "get_sec_filing": get_sec_filing,
-    "screen_stocks": screen_stocks,
-    "get_portfolio": get_alpaca_portfolio
-}
+# yfinance/pandas (research tools), alpaca-py (broker) and multiprocessing are
+# imported where they are used, so importing this module stays cheap
+
+def get_tool_map(model_id: str) -> dict:
+    """Research tools the model can call; get_portfolio reads this model's account."""
+    from .utils.research import (
+        get_price, get_financials, get_ratios, get_price_history,
+        get_insider_activity, get_institutional_holders, get_recommendations,
+        get_sec_filing, screen_stocks
+    )
+    from .utils.broker import get_alpaca_portfolio
+    return {
+        "get_price": get_price,
+        "get_financials": get_financials,
+        "get_ratios": get_ratios,
+        "get_price_history": get_price_history,
+        "get_insider_activity": get_insider_activity,
+        "get_institutional_holders": get_institutional_holders,
+        "get_recommendations": get_recommendations,
+        "get_sec_filing": get_sec_filing,
+        "screen_stocks": screen_stocks,
+        "get_portfolio": lambda: get_alpaca_portfolio(model_id)
+    }
 
 def format_portfolio(portfolio):
     return json.dumps(portfolio, indent=2, default=str)
 
 def parse_model_response(response_text):
-    try:
-        # Extract JSON from code block if present
-        match = re.search(r"```json\s*(.*?)\s*```", response_text, re.DOTALL)
-        if match:
-            json_str = match.group(1)
-        else:
-            # Try to find start/end of json object
-            match = re.search(r"\{.*\}", response_text, re.DOTALL)
-            if match:
-                json_str = match.group(0)
-            else:
-                json_str = response_text
-        
-        return json.loads(json_str)
-    except Exception as e:
-        print(f"Error parsing JSON: {e}")
-        return {"trades": [], "research_notes": "Failed to parse model response."}
-
-def calculate_sell_amount(trade, portfolio):
-    # If shares="ALL", find position and calculate value
-    ticker = trade.get("ticker")
-    for pos in portfolio.get("positions", []):
-        if pos["ticker"] == ticker:
-            return pos["shares"] # This might be quantity, not USD amount?
-            # execute_trade logic takes amount_usd or needs logic adjustment
-    return 0
-
-def run_daily_review():
-    results = []
-    for model in MODELS:
-        print(f"Running for {model['id']}")
-        try:
-            # 1. Load portfolio state
-            portfolio = load_portfolio(model["id"])
-            
-            # 2. Update current prices for positions (Simplified: Rely on Alpaca or get_price)
-            # In this local state, we might want to update `nav_history` roughly
-            # But strict NAV update happens via Alpaca sync usually.
-            # We will skip strict local update for now as `get_portfolio` tool provides live data.
-            
-            # 3. Build prompt
-            prompt = SYSTEM_PROMPT.format(
-                portfolio_state=format_portfolio(portfolio),
-                today=datetime.now().strftime("%Y-%m-%d")
-            )
-            
-            # 4. Call model
-            # We pass TOOL_MAP so llm can execute
-            response = call_openrouter(
-                model=model["id"],
-                system=prompt,
-                tools_schema=RESEARCH_TOOLS_SCHEMA,
-                tool_map=TOOL_MAP,
-                max_tokens=4000
-            )
-            
-            # 5. Parse and execute
-            parsed = parse_model_response(response)
-            
-            trades_executed = []
-            if "trades" in parsed and isinstance(parsed["trades"], list):
-                for trade in parsed["trades"]:
-                    # Calculate amount if SELL ALL
-                    amount_usd = trade.get("amount_usd")
-                    if trade.get("shares") == "ALL" and trade.get("action") == "SELL":
-                        # We need to know how much we have.
-                        # For this MVP, we might need to fetch live position size
-                        # execute_trade takes amount_usd. 
-                        # Alpaca API allows selling by Qty.
-                        # The execute_trade wrapper in utils/alpaca takes amount_usd.
-                        # We should probably adjust execute_trade to take qty or handle "ALL".
-                        pass 
-
-                    result = execute_trade(
-                        ticker=trade["ticker"],
-                        side=trade["action"],
-                        amount_usd=amount_usd if amount_usd else 0,
-                        model_id=model["id"]  # Pass model_id for tracking purposes only
-                    )
-                    log_trade(model["id"], trade, result)
-                    trades_executed.append(result)
-            
-            # 6. Save research notes
-            if "research_notes" in parsed:
-                save_research_log(model["id"], parsed["research_notes"])
-            
-            # 7. Update NAV (Calculate from tracked positions, not Alpaca)
-            # We track positions separately for each model in JSON files
-            update_nav(model["id"])  # Calculates NAV from tracked positions
-                
-            results.append({"model": model["id"], "status": "success", "trades": len(trades_executed)})
-            
-        except Exception as e:
-            print(f"Error running model {model['id']}: {e}")
-            results.append({"model": model["id"], "status": "error", "error": str(e)})
+    """
+    The model's decision from its final message (see utils/decisions.py).
+    Malformed trades are dropped with a warning; if no usable decision is
+    found the result has no trades and a "parse_error".
+    """
+    decision, errors = validate_decision(extract_decision(response_text or ""))
+    if decision is None:
+        error = "no JSON object with a \"trades\" list found"
+        print(f"Error parsing JSON: {error}")
+        return {"trades": [], "parse_error": error}
+    for error in errors:
+        print(f"Warning: Dropping {error}")
+    return decision
+
+def research_model(model_id: str, portfolio: dict):
+    """
+    Prompt the model with its portfolio and run the research tool loop.
+
+    Returns:
+        (raw response text, parsed decision dict)
+    """
+    # 2. Update current prices for positions (Simplified: Rely on Alpaca or get_price)
+    # In this local state, we might want to update `nav_history` roughly
+    # But strict NAV update happens via Alpaca sync usually.
+    # We will skip strict local update for now as `get_portfolio` tool provides live data.
+
+    # 3. Build prompt
+    with span("build_prompt", model=model_id) as info:
+        prompt = SYSTEM_PROMPT.format(
+            portfolio_state=format_portfolio(portfolio),
+            today=datetime.now().strftime("%Y-%m-%d")
+        )
+        info["bytes"] = len(prompt)
+
+    # 4. Call model
+    # We pass the tool map so llm can execute
+    tool_map = get_tool_map(model_id)
+    with span("llm", category="llm", model=model_id):
+        response = call_openrouter(
+            model=model_id,
+            system=prompt,
+            tools_schema=RESEARCH_TOOLS_SCHEMA,
+            tool_map=tool_map,
+            max_tokens=4000
+        )
+
+    # 5. Parse; trades are only collected here and executed in the batch
+    with span("parse", model=model_id, bytes=len(response or "")) as info:
+        parsed = parse_model_response(response)
+        info["trades"] = len(parsed.get("trades") or [])
+
+    # An answer without a usable decision is restated in the provider's JSON
+    # mode ("{}" means the spend cap or an LLM error, so there is nothing to restate)
+    if parsed.get("parse_error") and (response or "{}").strip() != "{}":
+        with span("llm_json", category="llm", model=model_id):
+            restated = call_openrouter_json(model_id, prompt, response, DECISION_SCHEMA)
+        if restated:
+            with span("parse", model=model_id, bytes=len(restated)) as info:
+                reparsed = parse_model_response(restated)
+                info["trades"] = len(reparsed.get("trades") or [])
+            if not reparsed.get("parse_error"):
+                parsed = reparsed
+    return response, parsed
+
+def research_worker(model_id: str, portfolio: dict, run_spend: float, trace_origin: float):
+    """
+    research_model in a worker process (MODEL_WORKERS > 0). Each LLM call's
+    cost is reported to the parent as it is charged, so a worker killed at
+    its deadline still counts against the budget; the trace spans and events
+    it produced are returned with the result for the parent to merge.
+    """
+    from .utils.workers import report
+    llm.current_run_spend = run_spend
+    llm.on_charge = lambda cost: report({"spend": cost})
+    events.EVENT_LOG_PATH = None  # The parent writes the log when it re-publishes
+    start_trace(trace_origin)
+    queue = events.subscribe()
+
+    with span("research", model=model_id):
+        response, parsed = research_model(model_id, portfolio)
+
+    emitted = []
+    while not queue.empty():
+        emitted.append(queue.get_nowait())
+    return {
+        "response": response,
+        "parsed": parsed,
+        "spans": collect_spans(),
+        "events": emitted
+    }
+
+def _research_outcomes(model_ids: list, portfolios: dict):
+    """
+    Yield (model_id, outcome) for each model's research, in-process or in
+    isolated workers depending on MODEL_WORKERS. outcome is
+    {"ok": True, "value": (response, parsed)} or {"ok": False, "error"}.
+    """
+    if MODEL_WORKERS <= 0:
+        for model_id in model_ids:
+            try:
+                with span("research", model=model_id):
+                    outcome = {"ok": True, "value": research_model(model_id, portfolios[model_id])}
+            except Exception as e:
+                outcome = {"ok": False, "error": str(e)}
+            yield model_id, outcome
+        return
+
+    from .utils.workers import run_workers
+    jobs = [
+        (model_id, research_worker,
+         lambda model_id=model_id: (model_id, portfolios[model_id], llm.current_run_spend, trace_origin()))
+        for model_id in model_ids
+    ]
+    def charge(model_id, message):
+        llm.current_run_spend += message["spend"]
+
+    for model_id, outcome in run_workers(jobs, MODEL_WORKERS, MODEL_DEADLINE_SECONDS, MODEL_RSS_LIMIT_MB,
+                                         on_report=charge):
+        if outcome["ok"]:
+            value = outcome["value"]
+            add_spans(value["spans"])
+            for event in value["events"]:
+                emit(event.pop("type"), **{k: v for k, v in event.items() if k != "id"})
+            outcome = {"ok": True, "value": (value["response"], value["parsed"])}
+        yield model_id, outcome
+
+def run_daily_review(progress=None, model_ids: list = None, research: bool = True, trade: bool = True):
+    """
+    Run one research-and-trade cycle for every model (or only model_ids).
+
+    Every model decides first; their trades are then netted per symbol and
+    sent as one batch (see utils/orders.py), and each model's share of the
+    fills is booked before its NAV is updated.
+
+    Progress is checkpointed per model (see utils/checkpoint.py). Running it
+    again on the same day resumes: models that already decided are not sent
+    to the LLM again, orders already sent are looked up by their idempotency
+    key instead of being resubmitted, and fills already booked are not
+    booked twice.
+
+    Args:
+        progress: Optional callback progress(model_id, stage, **info), called as
+            each model moves through researching -> decided -> trading ->
+            updating_nav -> done (or error)
+        model_ids: Optional subset of MODELS to run
+        research: False to ask no model: only models that already decided
+            today trade, the rest just get their NAV updated
+        trade: False to stop once every model has decided. A sharded cycle
+            researches per shard this way, then trades all models in one
+            batch (research=False) so their orders are netted together
+            (see utils/shards.py)
+    """
+    from .utils.orders import build_order_intents, execute_order_batch
 
+    def report(model_id, stage, **info):
+        emit("model_stage", model=model_id, stage=stage, **info)
+        if progress:
+            progress(model_id, stage, **info)
+
+    models = [model for model in MODELS if model_ids is None or model["id"] in model_ids]
+    emit("cycle_start", models=[model["id"] for model in models])
+    start_trace()
+    cycle_started = time.perf_counter()
+    checkpoint = load_checkpoint()
+    results = {}
+    intents = []
+    books = {}
+    undecided = set()  # Ran without a usable model response; retried on the next run
+    portfolios = {}
+
+    def decided_with(model_id, trades):
+        if trade and not reached(checkpoint, model_id, "reconciled"):
+            model_intents = build_order_intents(model_id, trades, portfolios[model_id])
+            intents.extend(model_intents)
+            books[model_id] = build_book(portfolios[model_id], calculate_cash_balance(model_id))
+        results[model_id] = {"model": model_id, "status": "success", "trades": 0}
+        report(model_id, "decided", trades_planned=len(trades))
+
+    with span("cycle", models=len(models)):
+        to_research = []
+        for model in models:
+            try:
+                report(model["id"], "researching")
+                # 1. Load portfolio state
+                with span("load_portfolio", model=model["id"]):
+                    portfolios[model["id"]] = load_portfolio(model["id"], readonly=True)
+
+                if reached(checkpoint, model["id"], "decided"):
+                    # Decided on an earlier run today; reuse its trades
+                    print(f"Resuming {model['id']} from checkpoint "
+                          f"({checkpoint['models'][model['id']]['stage']})")
+                    decided_with(model["id"], checkpoint["models"][model["id"]].get("trades", []))
+                elif research:
+                    to_research.append(model["id"])
+                else:
+                    undecided.add(model["id"])
+                    decided_with(model["id"], [])
+            except Exception as e:
+                print(f"Error running model {model['id']}: {e}")
+                results[model["id"]] = {"model": model["id"], "status": "error", "error": str(e)}
+                report(model["id"], "error", error=str(e))
+
+        for model_id, outcome in _research_outcomes(to_research, portfolios):
+            print(f"Research finished for {model_id}")
+            try:
+                if not outcome["ok"]:
+                    raise RuntimeError(outcome["error"])
+                response, parsed = outcome["value"]
+                trades = parsed.get("trades") if isinstance(parsed.get("trades"), list) else []
+
+                # 6. Save research notes
+                if "research_notes" in parsed:
+                    with span("save_research_log", model=model_id):
+                        save_research_log(model_id, parsed["research_notes"])
+
+                # "{}" is what call_openrouter returns on spend cap or LLM failure
+                if (response or "{}").strip() == "{}":
+                    undecided.add(model_id)
+                elif parsed.get("parse_error"):
+                    # Keep the answer for inspection; a rerun asks the model again
+                    print(f"No usable decision from {model_id}: {parsed['parse_error']}")
+                    emit("decision_parse_failed", model=model_id, error=parsed["parse_error"], response_bytes=len(response))
+                    with span("save_research_log", model=model_id):
+                        save_research_log(model_id, f"Unparsed model response:\n\n{response}")
+                    undecided.add(model_id)
+                else:
+                    mark(checkpoint, model_id, "decided", trades=trades)
+                decided_with(model_id, trades)
+
+            except Exception as e:
+                print(f"Error running model {model_id}: {e}")
+                results[model_id] = {"model": model_id, "status": "error", "error": str(e)}
+                report(model_id, "error", error=str(e))
+
+        # 7. Check every trade against its model's book, then net the rest per
+        # symbol and send one order per symbol
+        decided = [model_id for model_id, result in results.items() if result["status"] == "success" and trade]
+        batch_models = [model_id for model_id in decided
+                        if model_id not in undecided and not reached(checkpoint, model_id, "reconciled")]
+        for model_id in decided:
+            report(model_id, "trading")
+
+        def record_submitted(order_ids):
+            checkpoint.setdefault("orders", {}).update(order_ids)
+            mark(checkpoint, batch_models, "submitted")
+
+        batch_started = time.perf_counter()
+        with span("order_batch", intents=len(intents)):
+            try:
+                executed = execute_order_batch(
+                    intents, books, day=checkpoint["date"],
+                    submitted=checkpoint.get("orders", {}), on_submitted=record_submitted
+                )
+            except Exception as e:
+                # Nothing is checkpointed past "submitted", so a rerun retries the batch
+                # and picks up any orders that did go out by their idempotency keys
+                print(f"Error executing order batch: {e}")
+                executed = []
+                for model_id in batch_models:
+                    results[model_id] = {"model": model_id, "status": "error", "error": str(e)}
+                    report(model_id, "error", error=str(e))
+        batch_ms = (time.perf_counter() - batch_started) * 1000
+
+        trades_by_model = {}
+        for intent, result in executed:
+            trades_by_model.setdefault(intent["model_id"], []).append((intent["trade"], result))
+        for model_id in batch_models:
+            if results[model_id]["status"] == "success":
+                mark(checkpoint, model_id, "reconciled", results=trades_by_model.get(model_id, []))
+
+        for model_id in [m for m in decided if results[m]["status"] == "success"]:
+            try:
+                entry = checkpoint["models"].get(model_id, {})
+                model_trades = entry.get("results", [])
+
+                # 8. Book this model's share of each reconciled fill in one write
+                if model_id not in undecided and not reached(checkpoint, model_id, "booked"):
+                    for trade, result in model_trades:
+                        emit(
+                            "trade_submitted", model=model_id, ticker=trade.get("ticker"),
+                            side=trade.get("action"), amount_usd=trade.get("amount_usd"), latency_ms=batch_ms,
+                            order_id=result.get("id"), status=result.get("status"), error=result.get("error"),
+                            filled_qty=result.get("filled_qty"), fill_price=result.get("filled_avg_price"),
+                            fill_confirmed=result.get("fill_confirmed", False), rejected=result.get("rejected", False)
+                        )
+                    with span("log_trades", model=model_id, trades=len(model_trades)):
+                        log_trades(model_id, model_trades)
+                    mark(checkpoint, model_id, "booked")
+
+                # 9. Update NAV (Calculate from tracked positions, not Alpaca)
+                if not reached(checkpoint, model_id, "nav_updated"):
+                    report(model_id, "updating_nav")
+                    # We track positions separately for each model in JSON files
+                    with span("update_nav", model=model_id):
+                        nav = update_nav(model_id)  # Calculates NAV from tracked positions
+                    emit("nav", model=model_id, nav=nav)
+                    if model_id not in undecided:
+                        mark(checkpoint, model_id, "nav_updated")
+
+                results[model_id]["trades"] = len(model_trades)
+                report(model_id, "done", trades=len(model_trades))
+
+            except Exception as e:
+                print(f"Error running model {model_id}: {e}")
+                results[model_id] = {"model": model_id, "status": "error", "error": str(e)}
+                report(model_id, "error", error=str(e))
+
+        # Re-encode the /api/portfolios snapshot once, now that every model is saved
+        if trade:
+            with span("leaderboard_snapshot") as info:
+                info["bytes"] = write_leaderboard_snapshot().get("size")
+
+    write_trace()
+    results = [results[model["id"]] for model in models if model["id"] in results]
+    emit("cycle_end", results=results, elapsed_s=time.perf_counter() - cycle_started)
     return results
 
 # For Vercel Serverless, we must export 'handler' but Vercel python runtime 
@@ -138,14 +370,26 @@ def run_daily_review():
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
+        # Cron entry point: start one /api/run_model invocation per model and
+        # return at once, so no single function has to fit the whole cycle
         try:
-            summary = run_daily_review()
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"status": "complete", "results": summary}).encode('utf-8'))
+            from .utils.dispatch import is_authorized, base_url, dispatch_model_runs
+            if not is_authorized(self.headers):
+                self.send_json(401, {"error": "Unauthorized"})
+                return
+            dispatched = dispatch_model_runs(
+                base_url(self.headers),
+                [model["id"] for model in MODELS],
+                authorization=self.headers.get("Authorization")
+            )
+            emit("cycle_dispatched", models=dispatched)
+            failed = [run for run in dispatched if run["status"] == "failed"]
+            self.send_json(502 if failed else 202, {"status": "dispatched", "models": dispatched})
         except Exception as e:
-            self.send_response(500)
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": str(e)}).encode('utf-8'))
+            self.send_json(500, {"error": str(e)})
 
+    def send_json(self, status, data):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode('utf-8'))
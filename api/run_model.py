@@ -0,0 +1,53 @@
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import json
+import os
+import traceback
+
+# One model's daily cycle, started per model by the /api/run_daily cron
+# dispatcher (see utils/dispatch.py). Each invocation writes only its own
+# model's results. The trade-off: each invocation sends its model's orders on
+# its own, so orders are not netted across models (only within one model's
+# trades). The sharded CI cycle and a single run_daily_review keep the
+# cross-model batch.
+
+class handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            from .utils.config import MODELS, MAX_DAILY_SPEND
+            from .utils.dispatch import is_authorized
+            if not is_authorized(self.headers):
+                self.send_json(401, {"error": "Unauthorized"})
+                return
+
+            model_id = parse_qs(urlparse(self.path).query).get("id", [None])[0]
+            if model_id not in [model["id"] for model in MODELS]:
+                self.send_json(400, {"error": f"Unknown model id: {model_id}"})
+                return
+
+            from .run_daily import run_daily_review
+            from .utils import llm
+            # A warm instance keeps module state between invocations; each run
+            # gets a fresh per-model share of the daily LLM budget (the
+            # environment variable reaches spawned research workers)
+            llm.current_run_spend = 0.0
+            llm.MAX_DAILY_SPEND = MAX_DAILY_SPEND / len(MODELS)
+            os.environ["MAX_DAILY_SPEND"] = str(llm.MAX_DAILY_SPEND)
+
+            results = run_daily_review(model_ids=[model_id])
+            self.send_json(200, {"status": "complete", "results": results})
+        except Exception as e:
+            print(f"Error in run_model API: {e}")
+            print(traceback.format_exc())
+            self.send_json(500, {"error": str(e)})
+
+    def send_json(self, status, data):
+        try:
+            self.send_response(status)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(data, default=str).encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            # The dispatcher stops waiting after DISPATCH_TIMEOUT_SECONDS;
+            # the run itself is already saved
+            pass
@@ -1,73 +1,247 @@
+import threading
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import MarketOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
-from .config import ALPACA_API_KEY, ALPACA_SECRET_KEY, ALPACA_PAPER
+from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.requests import StockLatestQuoteRequest
+from .config import ALPACA_PAPER, get_account_credentials
 from .research import get_price
 
-def execute_trade(ticker: str, side: str, amount_usd: float, model_id: str = None) -> dict:
+# TradingClients keyed by credential pair, built on first use and reused for
+# the rest of the process (one HTTP session per account)
+_client_pool = {}
+_data_client_pool = {}
+_client_pool_lock = threading.Lock()
+
+# Order states after which filled_qty / filled_avg_price no longer change
+TERMINAL_ORDER_STATUSES = {"filled", "canceled", "expired", "rejected", "done_for_day", "replaced", "stopped"}
+
+def get_trading_client(model_id: str = None):
+    """
+    Pooled TradingClient for a model's paper account, or None if no
+    credentials are configured. Models without their own keys share the
+    default account's client.
+    """
+    api_key, secret_key = get_account_credentials(model_id)
+    if not api_key or not secret_key:
+        return None
+
+    key = (api_key, secret_key)
+    with _client_pool_lock:
+        client = _client_pool.get(key)
+        if client is None:
+            client = TradingClient(api_key, secret_key, paper=ALPACA_PAPER)
+            _client_pool[key] = client
+    return client
+
+def get_data_client(model_id: str = None):
+    """Pooled market-data client for a model's credentials, or None if none are configured."""
+    api_key, secret_key = get_account_credentials(model_id)
+    if not api_key or not secret_key:
+        return None
+
+    key = (api_key, secret_key)
+    with _client_pool_lock:
+        client = _data_client_pool.get(key)
+        if client is None:
+            client = StockHistoricalDataClient(api_key, secret_key)
+            _data_client_pool[key] = client
+    return client
+
+def get_latest_quotes(tickers: list, model_id: str = None) -> dict:
+    """
+    Latest quotes for all tickers from Alpaca market data in one request.
+
+    Returns:
+        {ticker: {"price", "bid", "ask", "timestamp", "source"}} where price is
+        the bid/ask midpoint (or whichever side is quoted). Tickers without a
+        usable quote are left out.
+    """
+    client = get_data_client(model_id)
+    if client is None or not tickers:
+        return {}
+    try:
+        quotes = client.get_stock_latest_quote(StockLatestQuoteRequest(symbol_or_symbols=list(tickers)))
+    except Exception as e:
+        print(f"Error fetching latest quotes: {e}")
+        return {}
+
+    result = {}
+    for ticker, quote in quotes.items():
+        bid = float(quote.bid_price or 0)
+        ask = float(quote.ask_price or 0)
+        if bid > 0 and ask > 0:
+            price = (bid + ask) / 2
+        else:
+            price = ask or bid
+        if price > 0:
+            result[ticker] = {
+                "price": price,
+                "bid": bid,
+                "ask": ask,
+                "timestamp": quote.timestamp.isoformat() if quote.timestamp else None,
+                "source": "alpaca"
+            }
+    return result
+
+def get_reference_quotes(tickers: list, model_id: str = None) -> dict:
+    """
+    Prices for sizing orders: one batched broker quote request, with a
+    yfinance lookup only for tickers the broker did not quote.
+
+    Returns:
+        {ticker: {"price", "timestamp", "source"}}; price is None if no source had one
+    """
+    quotes = get_latest_quotes(tickers, model_id)
+    for ticker in tickers:
+        if ticker not in quotes:
+            quotes[ticker] = {"price": get_price(ticker).get("price"), "timestamp": None, "source": "yfinance"}
+    return quotes
+
+def execute_trade(ticker: str, side: str, amount_usd: float = 0, model_id: str = None,
+                  price: float = None, qty=None, client_order_id: str = None) -> dict:
     """
     Execute a trade via Alpaca paper trading.
-    Note: All models share the same Alpaca account, but we track positions separately in JSON files.
+    Orders go to the model's own paper account when model-specific keys are
+    configured (see get_alpaca_credentials), otherwise to the shared default
+    account. Positions are tracked separately per model in JSON files either way.
     
     Args:
         ticker: Stock ticker symbol
         side: "BUY" or "SELL"
-        amount_usd: Dollar amount to trade
-        model_id: Model ID for tracking purposes (not used for account selection)
+        amount_usd: Dollar amount to trade (ignored when qty is given)
+        model_id: Model whose account to trade in
+        price: Reference price used to size the order (looked up if omitted)
+        qty: Share quantity to trade directly, skipping the price lookup, or
+            "ALL" to close the whole broker position. Only use "ALL" on an
+            account no other model trades in (see has_dedicated_account).
+        client_order_id: Idempotency key. If an order with this key already
+            exists (a retried submission), that order is returned instead.
     """
-    if not ALPACA_API_KEY or not ALPACA_SECRET_KEY:
+    client = get_trading_client(model_id)
+    if client is None:
         print("Alpaca credentials missing.")
         return {"error": "Credentials missing"}
 
-    client = TradingClient(ALPACA_API_KEY, ALPACA_SECRET_KEY, paper=ALPACA_PAPER)
-    
-    # Get current price to calculate shares
-    price_data = get_price(ticker)
-    price = price_data.get("price")
-    
-    if not price:
-        return {"error": "Could not get price"}
+    if qty == "ALL":
+        try:
+            order_result = client.close_position(ticker)
+            return order_to_dict(order_result, ticker, "SELL", price)
+        except Exception as e:
+            print(f"Error closing position: {e}")
+            return {"error": str(e), "symbol": ticker, "side": side}
 
-    qty = amount_usd / price
+    if qty is None:
+        # Get current price to calculate shares
+        if not price:
+            price = get_reference_quotes([ticker], model_id)[ticker]["price"]
+
+        if not price:
+            return {"error": "Could not get price"}
+
+        qty = amount_usd / price
+
+    if qty <= 0:
+        return {"error": "Order quantity must be positive", "symbol": ticker, "side": side}
     
     # Alpaca supports fractional shares for many stocks
     order = MarketOrderRequest(
         symbol=ticker,
         qty=qty,
         side=OrderSide.BUY if side == "BUY" else OrderSide.SELL,
-        time_in_force=TimeInForce.DAY
+        time_in_force=TimeInForce.DAY,
+        client_order_id=client_order_id
     )
     
     try:
         order_result = client.submit_order(order)
-        # Convert Alpaca order object to dict for easier tracking
-        return {
-            "id": str(order_result.id) if hasattr(order_result, 'id') else None,
-            "status": str(order_result.status) if hasattr(order_result, 'status') else None,
-            "filled_qty": float(order_result.filled_qty) if hasattr(order_result, 'filled_qty') else qty,
-            "filled_avg_price": float(order_result.filled_avg_price) if hasattr(order_result, 'filled_avg_price') else price,
-            "qty": float(order_result.qty) if hasattr(order_result, 'qty') else qty,
-            "price": price,
-            "symbol": ticker,
-            "side": side
-        }
     except Exception as e:
-        print(f"Error executing trade: {e}")
-        return {"error": str(e), "symbol": ticker, "side": side}
+        if client_order_id:
+            # A duplicate key means this order went out on an earlier attempt
+            try:
+                order_result = client.get_order_by_client_id(client_order_id)
+                print(f"Order {client_order_id} already submitted, reusing it")
+            except Exception:
+                order_result = None
+        else:
+            order_result = None
+        if order_result is None:
+            print(f"Error executing trade: {e}")
+            return {"error": str(e), "symbol": ticker, "side": side}
+
+    result = order_to_dict(order_result, ticker, side, price)
+    if result["qty"] is None:
+        result["qty"] = qty
+    return result
+
+def _float_or_none(value):
+    return float(value) if value is not None else None
+
+def order_to_dict(order_result, ticker: str, side: str, price: float = None) -> dict:
+    """
+    Convert an Alpaca order object to a dict for tracking. filled_qty and
+    filled_avg_price are None/0 until the broker reports a fill, which for a
+    just-submitted market order is usually not yet.
+    """
+    status = getattr(order_result, "status", None)
+    return {
+        "id": str(order_result.id) if getattr(order_result, "id", None) else None,
+        "status": str(getattr(status, "value", status)).lower() if status is not None else None,
+        "filled_qty": _float_or_none(getattr(order_result, "filled_qty", None)),
+        "filled_avg_price": _float_or_none(getattr(order_result, "filled_avg_price", None)),
+        "qty": _float_or_none(getattr(order_result, "qty", None)),
+        "price": price,
+        "symbol": ticker,
+        "side": side
+    }
+
+def get_order(order_id: str, model_id: str = None) -> dict:
+    """
+    Current state of a submitted order, in the same shape execute_trade
+    returns (with an "error" key if the lookup failed).
+    """
+    client = get_trading_client(model_id)
+    if client is None:
+        return {"error": "Credentials missing", "id": order_id}
+    try:
+        order_result = client.get_order_by_id(order_id)
+        side = getattr(order_result.side, "value", order_result.side)
+        return order_to_dict(order_result, order_result.symbol, str(side).upper())
+    except Exception as e:
+        print(f"Error fetching order {order_id}: {e}")
+        return {"error": str(e), "id": order_id}
+
+def cancel_order(order_id: str, model_id: str = None) -> dict:
+    """
+    Ask Alpaca to cancel an open order. Part of it may still fill before the
+    cancel lands; read the final state with get_order.
+
+    Returns:
+        {} on success, {"error": ...} otherwise
+    """
+    client = get_trading_client(model_id)
+    if client is None:
+        return {"error": "Credentials missing", "id": order_id}
+    try:
+        client.cancel_order_by_id(order_id)
+        return {}
+    except Exception as e:
+        print(f"Error canceling order {order_id}: {e}")
+        return {"error": str(e), "id": order_id}
 
 def get_alpaca_portfolio(model_id: str = None) -> dict:
     """
     Get current positions and account info from Alpaca.
-    Note: This returns the shared Alpaca account data. For model-specific portfolios,
-    use the portfolio tracking system in utils/portfolio.py instead.
+    Note: Models without their own keys all see the shared default account. For
+    model-specific portfolios, use the portfolio tracking system in
+    utils/portfolio.py instead.
     
     Args:
-        model_id: Not used (kept for compatibility)
+        model_id: Model whose account to read (default account if None)
     """
-    if not ALPACA_API_KEY or not ALPACA_SECRET_KEY:
+    client = get_trading_client(model_id)
+    if client is None:
         return {"error": "Credentials missing"}
-
-    client = TradingClient(ALPACA_API_KEY, ALPACA_SECRET_KEY, paper=ALPACA_PAPER)
     account = client.get_account()
     positions = client.get_all_positions()
     
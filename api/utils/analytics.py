@@ -0,0 +1,171 @@
+import numpy as np
+from .config import MODELS
+from .portfolio import load_portfolio
+from .prices import get_daily_closes, align_closes
+
+TRADING_DAYS_PER_YEAR = 252
+BENCHMARK_TICKER = "SPY"
+RISK_FREE_RATE = 0.0  # Annualized, used for Sharpe and alpha
+
+def build_calendar(portfolios: list) -> np.ndarray:
+    """
+    Common trading-day calendar: the sorted union of every date that appears
+    in any model's nav_history. Returned as datetime64[D].
+    """
+    dates = set()
+    for p in portfolios:
+        for point in p.get("nav_history", []):
+            dates.add(point["date"][:10])
+    return np.array(sorted(dates), dtype="datetime64[D]")
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs along the last axis. Leading NaNs are left in place."""
+    mask = ~np.isnan(values)
+    idx = np.where(mask, np.arange(values.shape[-1]), 0)
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    if values.ndim == 1:
+        return values[idx]
+    return values[np.arange(values.shape[0])[:, None], idx]
+
+def load_nav_matrix(portfolios: list):
+    """
+    Load every model's nav_history into one (models x days) array aligned on
+    the common calendar. Days before a model's first NAV point are filled with
+    its starting capital; gaps are forward-filled.
+
+    Returns:
+        (calendar, navs, starting_capital) as NumPy arrays
+    """
+    calendar = build_calendar(portfolios)
+    navs = np.full((len(portfolios), len(calendar)), np.nan)
+    capital = np.array([float(p.get("starting_capital", 10000)) for p in portfolios])
+
+    for i, p in enumerate(portfolios):
+        history = p.get("nav_history", [])
+        if not history:
+            continue
+        dates = np.array([point["date"][:10] for point in history], dtype="datetime64[D]")
+        values = np.array([point.get("nav") for point in history], dtype=float)
+        # Later points on the same date win, matching update_nav's overwrite
+        navs[i, np.searchsorted(calendar, dates)] = values
+
+    navs = _forward_fill(navs)
+    navs = np.where(np.isnan(navs), capital[:, None], navs)
+    return calendar, navs, capital
+
+def load_benchmark_series(calendar: np.ndarray, ticker: str = BENCHMARK_TICKER, refresh: bool = True):
+    """
+    Daily closes for the benchmark aligned on the calendar (from the local
+    price cache), or None if there are none.
+    """
+    if len(calendar) == 0:
+        return None
+
+    dates, closes = get_daily_closes(ticker, str(calendar[0]), refresh=refresh)
+    series = align_closes(calendar, dates, closes)
+    known = ~np.isnan(series)
+    if not known.any():
+        return None
+    # Backfill any leading gap with the first known close
+    return np.where(known, series, series[known][0])
+
+def compute_metrics(navs: np.ndarray, capital: np.ndarray, benchmark: np.ndarray = None) -> dict:
+    """
+    Compute performance metrics for all models in one vectorized pass.
+
+    Args:
+        navs: (models x days) NAV matrix
+        capital: (models,) starting capital
+        benchmark: optional (days,) benchmark close series
+
+    Returns:
+        Dict of metric name -> (models,) array
+    """
+    n_models, n_days = navs.shape
+    daily_rf = RISK_FREE_RATE / TRADING_DAYS_PER_YEAR
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = navs[:, 1:] / navs[:, :-1] - 1 if n_days > 1 else np.empty((n_models, 0))
+        total_return = navs[:, -1] / capital - 1 if n_days else np.full(n_models, np.nan)
+
+        if returns.shape[1] > 1:
+            mean = returns.mean(axis=1)
+            std = returns.std(axis=1, ddof=1)
+        else:
+            mean = np.full(n_models, np.nan)
+            std = np.full(n_models, np.nan)
+
+        volatility = std * np.sqrt(TRADING_DAYS_PER_YEAR)
+        sharpe = np.where(std > 0, (mean - daily_rf) / std * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan)
+
+        if n_days:
+            peaks = np.maximum.accumulate(navs, axis=1)
+            max_drawdown = (navs / peaks - 1).min(axis=1)
+        else:
+            max_drawdown = np.full(n_models, np.nan)
+
+        beta = np.full(n_models, np.nan)
+        alpha = np.full(n_models, np.nan)
+        benchmark_return = np.nan
+        if benchmark is not None and returns.shape[1] > 1:
+            bench_returns = benchmark[1:] / benchmark[:-1] - 1
+            benchmark_return = benchmark[-1] / benchmark[0] - 1
+            excess = returns - daily_rf
+            bench_excess = bench_returns - daily_rf
+            centered = excess - excess.mean(axis=1, keepdims=True)
+            bench_centered = bench_excess - bench_excess.mean()
+            bench_var = bench_centered @ bench_centered
+            if bench_var > 0:
+                beta = (centered @ bench_centered) / bench_var
+                alpha = (excess.mean(axis=1) - beta * bench_excess.mean()) * TRADING_DAYS_PER_YEAR
+
+    return {
+        "total_return": total_return,
+        "volatility": volatility,
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdown,
+        "beta": beta,
+        "alpha": alpha,
+        "benchmark_return": np.full(n_models, benchmark_return),
+    }
+
+def _clean(value):
+    value = float(value)
+    return None if np.isnan(value) or np.isinf(value) else value
+
+def _pct(value):
+    value = _clean(value)
+    return None if value is None else value * 100
+
+def get_performance_analytics(portfolios: list = None, include_benchmark: bool = True) -> dict:
+    """
+    Returns, volatility, max drawdown, Sharpe and alpha vs SPY for every model.
+    """
+    if portfolios is None:
+        portfolios = [load_portfolio(model["id"], readonly=True) for model in MODELS]
+
+    calendar, navs, capital = load_nav_matrix(portfolios)
+    benchmark = load_benchmark_series(calendar) if include_benchmark else None
+    metrics = compute_metrics(navs, capital, benchmark)
+
+    models = []
+    for i, p in enumerate(portfolios):
+        models.append({
+            "model_id": p.get("model_id"),
+            "nav": _clean(navs[i, -1]) if len(calendar) else None,
+            "total_return_pct": _pct(metrics["total_return"][i]),
+            "volatility_pct": _pct(metrics["volatility"][i]),
+            "max_drawdown_pct": _pct(metrics["max_drawdown"][i]),
+            "sharpe": _clean(metrics["sharpe"][i]),
+            "beta": _clean(metrics["beta"][i]),
+            "alpha_pct": _pct(metrics["alpha"][i]),
+        })
+
+    return {
+        "start_date": str(calendar[0]) if len(calendar) else None,
+        "end_date": str(calendar[-1]) if len(calendar) else None,
+        "trading_days": int(len(calendar)),
+        "benchmark": BENCHMARK_TICKER if benchmark is not None else None,
+        "benchmark_return_pct": _pct(metrics["benchmark_return"][0]) if len(portfolios) else None,
+        "models": models,
+    }
@@ -0,0 +1,178 @@
+import numpy as np
+from .config import MODELS
+from .portfolio import load_portfolio, save_portfolio, is_unfilled
+from .prices import load_price_matrix
+from .analytics import BENCHMARK_TICKER
+
+def _fill_hint(result) -> tuple:
+    """(price, qty) reported by the broker for a trade, mirroring calculate_cash_balance."""
+    if not isinstance(result, dict):
+        return None, None
+    price = result.get("filled_avg_price") or result.get("price")
+    qty = result.get("filled_qty") or result.get("qty")
+    try:
+        price = float(price) if price else None
+        qty = float(qty) if qty else None
+    except (ValueError, TypeError):
+        return None, None
+    return price, qty
+
+def _first_date(portfolio: dict):
+    dates = [p["date"][:10] for p in portfolio.get("nav_history", [])[:1]]
+    dates += [t["date"][:10] for t in portfolio.get("trade_history", []) if t.get("date")]
+    return min(dates) if dates else None
+
+def build_trade_deltas(portfolios: list, calendar: np.ndarray, tickers: list, prices: np.ndarray):
+    """
+    Turn every model's trade_history into share and cash deltas on the calendar.
+
+    A trade on a non-trading day lands on the next trading day. Trades after the
+    last cached close are left out; their effect is in the NAV points that
+    update_nav already wrote. So are trades in tickers with no cached closes,
+    both legs, which carries them at cost.
+
+    Returns:
+        (share_deltas, cash_deltas) shaped (models x days x tickers) and (models x days)
+    """
+    n_days = len(calendar)
+    ticker_index = {t: i for i, t in enumerate(tickers)}
+    # A ticker with no cached closes at all could only be valued at zero;
+    # leave its trades out entirely so its cash stays on the books instead
+    unpriced = np.isnan(prices).all(axis=1) if len(tickers) else np.zeros(0, dtype=bool)
+    for t in np.flatnonzero(unpriced):
+        print(f"Warning: No price data for {tickers[t]}, leaving its trades out of the backfill")
+    share_deltas = np.zeros((len(portfolios), n_days, len(tickers)))
+    cash_deltas = np.zeros((len(portfolios), n_days))
+
+    for m, portfolio in enumerate(portfolios):
+        held = {}
+        trades = sorted(
+            (t for t in portfolio.get("trade_history", []) if t.get("date") and t.get("ticker")),
+            key=lambda t: t["date"]
+        )
+        for trade in trades:
+            day = int(np.searchsorted(calendar, np.datetime64(trade["date"][:10], "D"), side="left"))
+            if day >= n_days:
+                continue
+
+            if is_unfilled(trade.get("result")):
+                continue  # Never filled: no shares and no cash moved
+
+            ticker = trade["ticker"]
+            action = trade.get("action", "").upper()
+            t = ticker_index[ticker]
+            if unpriced[t]:
+                continue
+            price, qty = _fill_hint(trade.get("result"))
+            if not price:
+                price = prices[t, day]
+            if not price or np.isnan(price):
+                print(f"Warning: No price for {ticker} on {calendar[day]}, skipping trade in backfill")
+                continue
+
+            if not qty:
+                shares = trade.get("shares")
+                if shares == "ALL":
+                    qty = held.get(ticker, 0)
+                elif shares:
+                    try:
+                        qty = float(shares)
+                    except (ValueError, TypeError):
+                        qty = 0
+                else:
+                    qty = (trade.get("amount_usd") or 0) / price
+
+            if action == "BUY":
+                sign = 1
+            elif action == "SELL":
+                # Can't sell more than the tracked book holds
+                qty = min(qty, held.get(ticker, 0))
+                sign = -1
+            else:
+                continue
+
+            if qty <= 0:
+                continue
+            held[ticker] = held.get(ticker, 0) + sign * qty
+            share_deltas[m, day, t] += sign * qty
+            cash_deltas[m, day] -= sign * qty * price
+
+    return share_deltas, cash_deltas
+
+def compute_nav_matrix(capital: np.ndarray, share_deltas: np.ndarray, cash_deltas: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """
+    Daily NAV for all models: cash plus the positions matrix times the price matrix.
+
+    Args:
+        capital: (models,) starting capital
+        share_deltas: (models x days x tickers)
+        cash_deltas: (models x days)
+        prices: (tickers x days), NaN-free
+    """
+    positions = np.cumsum(share_deltas, axis=1)
+    cash = capital[:, None] + np.cumsum(cash_deltas, axis=1)
+    return cash + np.einsum("mdt,td->md", positions, prices)
+
+def backfill_nav_history(model_ids: list = None, write: bool = True, refresh: bool = True) -> dict:
+    """
+    Rebuild daily nav_history for every model from trade_history and cached
+    daily closes.
+
+    Each model's history is regenerated for every trading day from its first NAV
+    point or trade up to the last cached close. Points after that (today's
+    intraday NAV) are kept as they are.
+
+    Args:
+        model_ids: Models to rebuild (defaults to all)
+        write: Save the rebuilt history back to the portfolio files
+        refresh: Top up the price cache from yfinance before rebuilding
+
+    Returns:
+        Dict of model_id -> rebuilt nav_history
+    """
+    if model_ids is None:
+        model_ids = [model["id"] for model in MODELS]
+    portfolios = [load_portfolio(model_id) for model_id in model_ids]
+
+    starts = [_first_date(p) for p in portfolios]
+    known_starts = [s for s in starts if s]
+    if not known_starts:
+        return {}
+    start = min(known_starts)
+
+    tickers = sorted({t["ticker"] for p in portfolios for t in p.get("trade_history", []) if t.get("ticker")})
+    # The benchmark supplies the trading-day calendar even when nothing was traded
+    calendar, prices = load_price_matrix([BENCHMARK_TICKER] + tickers, start, refresh=refresh)
+    prices = prices[1:]
+    if len(calendar) == 0:
+        print("Warning: No cached prices available, cannot backfill NAV")
+        return {}
+
+    share_deltas, cash_deltas = build_trade_deltas(portfolios, calendar, tickers, prices)
+
+    # Days before a ticker's first close hold no shares of it (those trades
+    # were skipped); zero the NaNs so they do not poison the sum
+    prices = np.nan_to_num(prices, nan=0.0)
+
+    capital = np.array([float(p.get("starting_capital", 10000)) for p in portfolios])
+    navs = compute_nav_matrix(capital, share_deltas, cash_deltas, prices)
+
+    last_day = str(calendar[-1])
+    day_strings = calendar.astype(str)
+    rebuilt = {}
+    for m, portfolio in enumerate(portfolios):
+        if not starts[m]:
+            continue
+        first = int(np.searchsorted(calendar, np.datetime64(starts[m], "D"), side="left"))
+        history = [
+            {"date": day_strings[d], "nav": float(navs[m, d])}
+            for d in range(first, len(calendar))
+        ]
+        history += [p for p in portfolio.get("nav_history", []) if p["date"][:10] > last_day]
+        rebuilt[portfolio["model_id"]] = history
+
+        if write:
+            portfolio["nav_history"] = history
+            save_portfolio(portfolio)
+
+    return rebuilt
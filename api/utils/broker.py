@@ -0,0 +1,12 @@
+from .config import BROKER, get_account_credentials, has_dedicated_account
+
+# Order routing backend for the cycle: Alpaca paper trading by default, or the
+# offline simulator with BROKER=sim. Both expose the same functions.
+if BROKER == "sim":
+    from .sim_broker import (
+        execute_trade, get_order, cancel_order, get_reference_quotes, get_alpaca_portfolio, TERMINAL_ORDER_STATUSES
+    )
+else:
+    from .alpaca import (
+        execute_trade, get_order, cancel_order, get_reference_quotes, get_alpaca_portfolio, TERMINAL_ORDER_STATUSES
+    )
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+from datetime import datetime
+from .portfolio import DATA_DIR, ensure_data_dir, atomic_write
+
+# Progress of today's cycle, so a rerun after a crash, timeout or spend cap
+# only does the unfinished work. Lives next to the portfolio files (and is
+# committed with them in CI); a checkpoint from an earlier day is ignored.
+CHECKPOINT_FILENAME = "_checkpoint.json"
+
+# Per-model stages in the order a cycle reaches them
+STAGES = ["decided", "submitted", "reconciled", "booked", "nav_updated"]
+
+_lock = threading.Lock()
+
+def _checkpoint_path() -> str:
+    return os.path.join(DATA_DIR, CHECKPOINT_FILENAME)
+
+def cycle_date() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+def load_checkpoint() -> dict:
+    """Today's checkpoint, or an empty one."""
+    today = cycle_date()
+    try:
+        with open(_checkpoint_path(), "r") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("date") == today:
+            return checkpoint
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Could not read checkpoint, starting fresh: {e}")
+    return {"date": today, "models": {}}
+
+def save_checkpoint(checkpoint: dict):
+    ensure_data_dir()
+    try:
+        with atomic_write(_checkpoint_path()) as f:
+            json.dump(checkpoint, f, default=str)
+    except Exception as e:
+        print(f"Error saving checkpoint: {e}")
+
+def reached(checkpoint: dict, model_id: str, stage: str) -> bool:
+    """True if the model has already completed `stage` today."""
+    current = checkpoint["models"].get(model_id, {}).get("stage")
+    return current is not None and STAGES.index(current) >= STAGES.index(stage)
+
+def _refresh(checkpoint: dict):
+    """
+    Pull in progress other runs saved since we loaded (runs for different
+    models can share the file, e.g. one invocation per model), so saving
+    does not overwrite it. The newer entry per model wins.
+    """
+    on_disk = load_checkpoint()
+    if on_disk["date"] != checkpoint["date"]:
+        return
+    for model_id, entry in on_disk["models"].items():
+        ours = checkpoint["models"].get(model_id)
+        if ours is None or entry.get("updated_at", "") > ours.get("updated_at", ""):
+            checkpoint["models"][model_id] = entry
+    for client_order_id, order_id in on_disk.get("orders", {}).items():
+        checkpoint.setdefault("orders", {}).setdefault(client_order_id, order_id)
+
+def mark(checkpoint: dict, model_ids, stage: str, **data):
+    """
+    Record that models completed `stage` (plus any per-stage data) and
+    persist the checkpoint immediately.
+
+    Args:
+        model_ids: One model id or a list of them
+        data: Fields stored on each model's entry, e.g. trades=[...]
+    """
+    if isinstance(model_ids, str):
+        model_ids = [model_ids]
+    with _lock:
+        _refresh(checkpoint)
+        for model_id in model_ids:
+            entry = checkpoint["models"].setdefault(model_id, {})
+            entry.update(data, stage=stage, updated_at=datetime.now().isoformat())
+        save_checkpoint(checkpoint)
+
+def merge_checkpoint(checkpoint: dict, part: dict):
+    """
+    Fold another run's checkpoint (e.g. one shard of a sharded cycle) into
+    `checkpoint` and persist it. Model entries in `part` replace ours; a part
+    from a different day is ignored.
+    """
+    if part.get("date") != checkpoint.get("date"):
+        print(f"Warning: Ignoring checkpoint from {part.get('date')} (cycle date {checkpoint.get('date')})")
+        return
+    with _lock:
+        checkpoint["models"].update(part.get("models", {}))
+        if part.get("orders"):
+            checkpoint.setdefault("orders", {}).update(part["orders"])
+        save_checkpoint(checkpoint)
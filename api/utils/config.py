@@ -1,8 +1,25 @@
 import os
 from typing import Optional, Tuple
-from dotenv import load_dotenv
 
-load_dotenv()
+def _find_env_file() -> Optional[str]:
+    """The nearest .env at or above this package (where load_dotenv() looks), or None."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# Deployed functions get their settings from the environment and ship no .env,
+# so python-dotenv (and the logging it pulls in) is only imported when there
+# is a file to load
+_env_file = _find_env_file()
+if _env_file:
+    from dotenv import load_dotenv
+    load_dotenv(_env_file)
 
 MODELS = [
     {"id": "openai/gpt-5.1", "display": "GPT 5.1"},
@@ -26,10 +43,11 @@ def get_alpaca_credentials(model_id: str) -> Tuple[Optional[str], Optional[str]]
     Looks for model-specific keys first, falls back to default keys.
     
     Model-specific format: ALPACA_API_KEY_{MODEL_ID} and ALPACA_SECRET_KEY_{MODEL_ID}
-    where MODEL_ID is the model ID with / replaced by _ (e.g., openai_gpt-5.1)
+    where MODEL_ID is the model ID with /, - and . replaced by _, uppercased
+    (e.g., OPENAI_GPT_5_1)
     """
-    # Convert model_id to environment variable format (replace / with _)
-    safe_model_id = model_id.replace("/", "_").replace("-", "_").upper()
+    # Convert model_id to environment variable format
+    safe_model_id = model_id.replace("/", "_").replace("-", "_").replace(".", "_").upper()
     
     # Try model-specific keys first
     model_api_key = os.environ.get(f"ALPACA_API_KEY_{safe_model_id}")
@@ -41,6 +59,40 @@ def get_alpaca_credentials(model_id: str) -> Tuple[Optional[str], Optional[str]]
     # Fall back to default keys
     return (ALPACA_API_KEY, ALPACA_SECRET_KEY)
 
+def get_account_credentials(model_id: str = None) -> Tuple[Optional[str], Optional[str]]:
+    """The (api_key, secret_key) pair a model trades with; the default pair if model_id is None."""
+    if model_id is None:
+        return (ALPACA_API_KEY, ALPACA_SECRET_KEY)
+    return get_alpaca_credentials(model_id)
+
+def has_dedicated_account(model_id: str) -> bool:
+    """
+    True if no other model trades with this model's credentials, so the broker
+    position in any symbol belongs to this model alone.
+    """
+    credentials = get_account_credentials(model_id)
+    if credentials == get_account_credentials(None):
+        return False
+    return all(get_account_credentials(m["id"]) != credentials for m in MODELS if m["id"] != model_id)
+
+# Order routing: "alpaca" (paper trading) or "sim" (offline simulator, utils/sim_broker.py)
+BROKER = os.environ.get("BROKER", "alpaca").lower()
+
+# Cron fan-out (api/run_daily.py dispatches one api/run_model.py invocation per model).
+# When CRON_SECRET is set, both endpoints require "Authorization: Bearer <CRON_SECRET>",
+# which Vercel Cron sends automatically.
+CRON_SECRET = os.environ.get("CRON_SECRET")
+DISPATCH_BASE_URL = os.environ.get("DISPATCH_BASE_URL") # Default: the host the cron request came in on
+DISPATCH_TIMEOUT_SECONDS = float(os.environ.get("DISPATCH_TIMEOUT_SECONDS", "5")) # Wait per model before returning
+
+# Model research in worker processes (0 = run every model in this process)
+MODEL_WORKERS = int(os.environ.get("MODEL_WORKERS", "0"))
+MODEL_DEADLINE_SECONDS = float(os.environ.get("MODEL_DEADLINE_SECONDS", "900")) # Wall clock per model
+MODEL_RSS_LIMIT_MB = float(os.environ.get("MODEL_RSS_LIMIT_MB", "1536")) # Worker killed above this
+
 # Safety Limits
-MAX_DAILY_SPEND = 2.00 # Maximum USD to spend on LLM calls per day
+MAX_DAILY_SPEND = float(os.environ.get("MAX_DAILY_SPEND", "2.00")) # Maximum USD to spend on LLM calls per day
 MAX_TOKENS_PER_RUN = 4000
+
+# Pre-trade checks (see utils/validation.py)
+MAX_POSITIONS = 15 # Prompt asks for 5-15 positions; buys that would open a 16th are rejected
@@ -0,0 +1,174 @@
+import json
+import math
+import re
+
+# Shape of the decision SYSTEM_PROMPT asks for. Also sent as the structured
+# output schema when a free-text answer has to be restated (llm.call_openrouter_json).
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "thinking": {"type": "string"},
+        "research_notes": {"type": "string"},
+        "trades": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string", "enum": ["BUY", "SELL"]},
+                    "ticker": {"type": "string"},
+                    "amount_usd": {"type": "number"},
+                    "shares": {"type": ["string", "number"]},
+                    "thesis": {"type": "string"},
+                    "reason": {"type": "string"}
+                },
+                "required": ["action", "ticker"]
+            }
+        }
+    },
+    "required": ["research_notes", "trades"]
+}
+
+# Outside any object only an opening brace matters (prose quotes are not
+# strings); inside one, a JSON string is consumed whole so braces in it are
+# skipped. A string cannot cross a newline, so an unpaired quote only hides
+# the rest of its own line.
+_OPEN_BRACE = re.compile(r"\{")
+_OBJECT_TOKEN = re.compile(r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"?|[{}]')
+
+def _object_spans(text: str) -> list:
+    """(start, end) of every balanced {...} in text, in the order they close. One pass."""
+    spans = []
+    stack = []
+    position = 0
+    while True:
+        match = (_OBJECT_TOKEN if stack else _OPEN_BRACE).search(text, position)
+        if match is None:
+            return spans
+        token = match.group()
+        if token == "{":
+            stack.append(match.start())
+        elif token == "}":
+            spans.append((stack.pop(), match.end()))
+        position = match.end()
+
+_decoder = json.JSONDecoder()
+
+def _top_level_objects(text: str):
+    """
+    Every top-level JSON object in text, parsed in C, or None as soon as an
+    opening brace does not start one (a draft, a stray brace in prose).
+    """
+    objects = []
+    position = text.find("{")
+    while position != -1:
+        try:
+            obj, end = _decoder.raw_decode(text, position)
+        except (ValueError, RecursionError):
+            return None
+        objects.append(obj)
+        position = text.find("{", end)
+    return objects
+
+def extract_decision(text: str):
+    """
+    The last well-formed top-level JSON object in a model response that has
+    a "trades" key, or None. Works on fenced or bare JSON and ignores earlier
+    drafts, examples and objects nested inside other valid JSON.
+    """
+    if not text:
+        return None
+    # Common case: every brace outside the JSON is absent, so the objects
+    # decode back to back
+    objects = _top_level_objects(text)
+    if objects is not None:
+        return next((obj for obj in reversed(objects) if "trades" in obj), None)
+
+    # Later-closing spans first; a span starting after the last well-formed
+    # object's start is nested inside it
+    floor = len(text)
+    for start, end in reversed(_object_spans(text)):
+        if start > floor:
+            continue
+        try:
+            obj = json.loads(text[start:end])
+        except (ValueError, RecursionError):
+            # RecursionError: nesting deeper than the decoder's recursion limit
+            continue
+        floor = start
+        if isinstance(obj, dict) and "trades" in obj:
+            return obj
+    return None
+
+def _positive_number(value):
+    """value as a positive finite float ("$2,000" included), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.replace("$", "").replace(",", "").strip()
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) and number > 0 else None
+
+def _validate_trade(trade):
+    """(normalised trade, None) or (None, reason)."""
+    if not isinstance(trade, dict):
+        return None, "trade is not an object"
+    action = str(trade.get("action") or "").strip().upper()
+    if action not in ("BUY", "SELL"):
+        return None, f"unknown action {trade.get('action')!r}"
+    ticker = trade.get("ticker")
+    if not isinstance(ticker, str) or not ticker.strip():
+        return None, "missing ticker"
+
+    normalised = dict(trade, action=action, ticker=ticker.strip().upper())
+    amount_usd = _positive_number(trade.get("amount_usd"))
+    if amount_usd is not None:
+        normalised["amount_usd"] = amount_usd
+    else:
+        normalised.pop("amount_usd", None)
+
+    if action == "BUY":
+        if amount_usd is None:
+            return None, f"BUY {normalised['ticker']} needs a positive amount_usd"
+        normalised.pop("shares", None)
+        return normalised, None
+
+    shares = trade.get("shares")
+    if isinstance(shares, str) and shares.strip().upper() == "ALL":
+        normalised["shares"] = "ALL"
+    elif _positive_number(shares) is not None:
+        normalised["shares"] = _positive_number(shares)
+    elif amount_usd is not None:
+        normalised.pop("shares", None)
+    else:
+        return None, f"SELL {normalised['ticker']} needs shares (\"ALL\" or a number) or amount_usd"
+    return normalised, None
+
+def validate_decision(obj):
+    """
+    Check an extracted decision against DECISION_SCHEMA and normalise it
+    (action and ticker upper-cased, amounts as floats). Malformed trades are
+    dropped and reported instead of failing the whole decision.
+
+    Returns:
+        (decision, errors). decision is None if the object itself is unusable.
+    """
+    if not isinstance(obj, dict) or not isinstance(obj.get("trades"), list):
+        return None, ['"trades" must be a list']
+
+    decision = dict(obj)
+    notes = obj.get("research_notes")
+    if notes is not None and not isinstance(notes, str):
+        decision["research_notes"] = json.dumps(notes, default=str)
+
+    errors = []
+    decision["trades"] = []
+    for i, trade in enumerate(obj["trades"]):
+        normalised, error = _validate_trade(trade)
+        if error:
+            errors.append(f"trade {i}: {error}")
+        else:
+            decision["trades"].append(normalised)
+    return decision, errors
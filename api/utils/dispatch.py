@@ -0,0 +1,58 @@
+import hmac
+import socket
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from .config import CRON_SECRET, DISPATCH_BASE_URL, DISPATCH_TIMEOUT_SECONDS
+
+# Fan-out for the cron path: /api/run_daily starts one /api/run_model
+# invocation per model, so each model gets its own function time limit.
+RUN_MODEL_PATH = "/api/run_model"
+
+def is_authorized(headers) -> bool:
+    """True if CRON_SECRET is unset, or the request carries it as a Bearer token."""
+    if not CRON_SECRET:
+        return True
+    return hmac.compare_digest(headers.get("Authorization") or "", f"Bearer {CRON_SECRET}")
+
+def base_url(headers) -> str:
+    """Where to reach this deployment: DISPATCH_BASE_URL, else the request's own host."""
+    if DISPATCH_BASE_URL:
+        return DISPATCH_BASE_URL.rstrip("/")
+    proto = headers.get("X-Forwarded-Proto") or "https"
+    return f"{proto}://{headers.get('X-Forwarded-Host') or headers.get('Host')}"
+
+def _start(url: str, headers: dict, timeout: float) -> dict:
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return {"status": "complete", "http_status": response.status}
+    except urllib.error.HTTPError as e:
+        return {"status": "failed", "http_status": e.code, "error": str(e)}
+    except (socket.timeout, TimeoutError):
+        # Still running: the invocation carries on after we stop waiting
+        return {"status": "started"}
+    except urllib.error.URLError as e:
+        if isinstance(e.reason, (socket.timeout, TimeoutError)):
+            return {"status": "started"}
+        return {"status": "failed", "error": str(e.reason)}
+
+def dispatch_model_runs(base: str, model_ids: list, authorization: str = None,
+                        timeout: float = DISPATCH_TIMEOUT_SECONDS) -> list:
+    """
+    Start RUN_MODEL_PATH?id=<model> for every model in parallel and return
+    without waiting for them to finish. A request still open after `timeout`
+    counts as started.
+
+    Returns:
+        [{"model", "status": "started" | "complete" | "failed", ...}] in model_ids order
+    """
+    headers = {"Authorization": authorization} if authorization else {}
+
+    def start(model_id):
+        url = f"{base}{RUN_MODEL_PATH}?{urllib.parse.urlencode({'id': model_id})}"
+        return dict(_start(url, headers, timeout), model=model_id)
+
+    with ThreadPoolExecutor(max_workers=max(len(model_ids), 1)) as pool:
+        return list(pool.map(start, model_ids))
@@ -0,0 +1,66 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# Structured events from the daily cycle: model stages, LLM turns, tool calls,
+# trades and NAV. Consumed by the dev server's SSE stream and, when
+# CYCLE_EVENT_LOG is set, appended as JSON Lines for monitoring.
+EVENT_LOG_PATH = os.environ.get("CYCLE_EVENT_LOG")
+
+# Recent events kept for subscribers that connect (or reconnect) mid-cycle
+HISTORY_SIZE = 2000
+SUBSCRIBER_QUEUE_SIZE = 10000
+
+_history = deque(maxlen=HISTORY_SIZE)
+_subscribers = []
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+def emit(event_type: str, **fields) -> dict:
+    """Publish an event to every subscriber and the event log."""
+    with _lock:
+        event = {"id": next(_ids), "type": event_type, "ts": time.time(), **fields}
+        _history.append(event)
+        subscribers = list(_subscribers)
+
+    for q in subscribers:
+        try:
+            q.put_nowait(event)
+        except queue.Full:
+            pass  # A stalled client loses events rather than stalling the cycle
+
+    if EVENT_LOG_PATH:
+        try:
+            with open(EVENT_LOG_PATH, "a") as f:
+                f.write(json.dumps(event, default=str) + "\n")
+        except Exception as e:
+            print(f"Warning: Could not write event log {EVENT_LOG_PATH}: {e}")
+    return event
+
+def subscribe(last_event_id: int = None) -> queue.Queue:
+    """
+    Register a subscriber queue. With last_event_id, events after that id that
+    are still in history are replayed first.
+    """
+    q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _lock:
+        if last_event_id is not None:
+            for event in _history:
+                if event["id"] > last_event_id:
+                    q.put_nowait(event)
+        _subscribers.append(q)
+    return q
+
+def unsubscribe(q: queue.Queue):
+    with _lock:
+        if q in _subscribers:
+            _subscribers.remove(q)
+
+def format_sse(event: dict) -> bytes:
+    """Encode an event as a Server-Sent Events message."""
+    data = json.dumps(event, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n".encode("utf-8")
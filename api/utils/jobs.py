@@ -0,0 +1,87 @@
+import threading
+import uuid
+from datetime import datetime
+
+# Background jobs for the dev server, kept in memory for the life of the process
+_jobs = {}
+_jobs_lock = threading.Lock()
+# Set when a job finishes, keyed by job id
+_done = {}
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def _snapshot(job: dict) -> dict:
+    snapshot = dict(job)
+    snapshot["models"] = {model_id: dict(state) for model_id, state in job["models"].items()}
+    snapshot["completed"] = sum(1 for state in job["models"].values() if state["stage"] in ("done", "error"))
+    snapshot["total"] = len(job["models"])
+    return snapshot
+
+def start_job(name: str, target, model_ids: list) -> dict:
+    """
+    Run target(progress=...) in a background thread and return the job record.
+    Only one job per name runs at a time; starting another returns the running one.
+
+    The target reports per-model progress by calling
+    progress(model_id, stage, **info).
+    """
+    with _jobs_lock:
+        for job in _jobs.values():
+            if job["name"] == name and job["status"] == "running":
+                return _snapshot(job)
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "name": name,
+            "status": "running",
+            "started_at": _now(),
+            "finished_at": None,
+            "models": {model_id: {"stage": "pending"} for model_id in model_ids},
+            "result": None,
+            "error": None
+        }
+        _jobs[job_id] = job
+        _done[job_id] = threading.Event()
+
+    def progress(model_id: str, stage: str, **info):
+        with _jobs_lock:
+            state = job["models"].setdefault(model_id, {})
+            state.update(info)
+            state["stage"] = stage
+            state["updated_at"] = _now()
+
+    def run():
+        try:
+            result = target(progress=progress)
+            status, error = "complete", None
+        except Exception as e:
+            print(f"Error in job {name} ({job_id}): {e}")
+            result, status, error = None, "error", str(e)
+        with _jobs_lock:
+            job["result"] = result
+            job["error"] = error
+            job["status"] = status
+            job["finished_at"] = _now()
+        _done[job_id].set()
+
+    threading.Thread(target=run, name=f"job-{name}-{job_id}", daemon=True).start()
+    return get_job(job_id)
+
+def get_job(job_id: str = None):
+    """A job's current state, or the most recently started job if no id is given."""
+    with _jobs_lock:
+        if job_id is None:
+            if not _jobs:
+                return None
+            job_id = max(_jobs.values(), key=lambda j: j["started_at"])["id"]
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job else None
+
+def wait_job(job_id: str, timeout: float = None):
+    """Block until a job finishes (or timeout passes) and return its state."""
+    done = _done.get(job_id)
+    if done is not None:
+        done.wait(timeout)
+    return get_job(job_id)
@@ -0,0 +1,91 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from .portfolio import DATA_DIR, ensure_data_dir, get_all_portfolios, atomic_write
+
+# Pre-encoded /api/portfolios response, written once per cycle
+SNAPSHOT_FILENAME = "_leaderboard.json"
+SNAPSHOT_GZIP_FILENAME = "_leaderboard.json.gz"
+SNAPSHOT_META_FILENAME = "_leaderboard.meta.json"
+
+# Browsers revalidate every load (cheap 304s); the CDN may serve a copy for a
+# few minutes and keep serving stale while it refetches in the background
+SNAPSHOT_CACHE_CONTROL = "public, max-age=0, must-revalidate, s-maxage=300, stale-while-revalidate=86400"
+
+# Process-level copy of the snapshot, keyed on the meta file's mtime
+_snapshot_cache = {"mtime_ns": None, "snapshot": None}
+
+def _snapshot_path(filename: str) -> str:
+    return os.path.join(DATA_DIR, filename)
+
+def write_leaderboard_snapshot(portfolios: list = None) -> dict:
+    """
+    Encode the full portfolios response once, gzip it, and write both with a
+    content hash. Call after anything that changes portfolio files.
+
+    Returns:
+        Snapshot metadata (etag, sizes, generated_at)
+    """
+    if portfolios is None:
+        portfolios = get_all_portfolios()
+
+    raw = json.dumps(portfolios, default=str).encode("utf-8")
+    compressed = gzip.compress(raw, compresslevel=9, mtime=0)
+    meta = {
+        "etag": '"' + hashlib.sha256(raw).hexdigest()[:32] + '"',
+        "generated_at": datetime.now().isoformat(),
+        "size": len(raw),
+        "gzip_size": len(compressed)
+    }
+
+    ensure_data_dir()
+    try:
+        with atomic_write(_snapshot_path(SNAPSHOT_FILENAME), "wb") as f:
+            f.write(raw)
+        with atomic_write(_snapshot_path(SNAPSHOT_GZIP_FILENAME), "wb") as f:
+            f.write(compressed)
+        # Meta goes last so readers never see a hash for bytes not yet written
+        with atomic_write(_snapshot_path(SNAPSHOT_META_FILENAME)) as f:
+            json.dump(meta, f)
+    except Exception as e:
+        print(f"Error writing leaderboard snapshot: {e}")
+    return meta
+
+def load_leaderboard_snapshot():
+    """
+    (meta, raw_bytes, gzip_bytes) for the current snapshot, or None if no
+    snapshot has been written. Bytes are read from disk only when the meta
+    file changes.
+    """
+    meta_path = _snapshot_path(SNAPSHOT_META_FILENAME)
+    try:
+        mtime_ns = os.stat(meta_path).st_mtime_ns
+    except OSError:
+        return None
+
+    if _snapshot_cache["mtime_ns"] != mtime_ns:
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(_snapshot_path(SNAPSHOT_FILENAME), "rb") as f:
+                raw = f.read()
+            with open(_snapshot_path(SNAPSHOT_GZIP_FILENAME), "rb") as f:
+                compressed = f.read()
+        except Exception as e:
+            print(f"Error loading leaderboard snapshot: {e}")
+            return None
+        _snapshot_cache["mtime_ns"] = mtime_ns
+        _snapshot_cache["snapshot"] = (meta, raw, compressed)
+
+    return _snapshot_cache["snapshot"]
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True if an If-None-Match header value matches the ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
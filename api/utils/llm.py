@@ -1,11 +1,15 @@
 import os
 import json
 import time
-from openai import OpenAI
 from .config import OPENROUTER_API_KEY, MAX_DAILY_SPEND
+from .events import emit
+from .tracing import span
 
 # Global estimated spend tracker for this process run
 current_run_spend = 0.0
+# Optional callback on_charge(cost), called as each call's cost is added (a
+# research worker forwards it to the parent, see run_daily.research_worker)
+on_charge = None
 
 # Approximate costs per 1k tokens (blended input/output for simplicity)
 # Adjust based on actual model pricing
@@ -33,21 +37,18 @@ def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> flo
     total_tokens = prompt_tokens + completion_tokens
     return (total_tokens / 1000) * rate
 
-def call_openrouter(model: str, system: str, tools_schema: list, tool_map: dict, max_tokens: int = 4000):
-    global current_run_spend
-    
-    if current_run_spend >= MAX_DAILY_SPEND:
-        print(f"DAILY SPEND LIMIT REACHED (${current_run_spend:.4f} / ${MAX_DAILY_SPEND}). Stopping LLM calls.")
-        return "{}"
+# Opening user turn of every daily review
+REVIEW_REQUEST = "Please review the portfolio and market conditions for today. Use your research tools to gather data, then output your analysis and trading decisions in the specified JSON format."
 
-    # Check if API key is set
-    if not OPENROUTER_API_KEY:
-        print("ERROR: OPENROUTER_API_KEY is not set!")
-        return "{}"
+RESTATE_REQUEST = "Restate the final decision from your previous message as a single JSON object in the specified format. Output only the JSON."
+
+def _client():
+    # Imported here so importing this module (e.g. for current_run_spend) stays cheap
+    from openai import OpenAI
     
     # OpenRouter requires specific headers for free/paid tiers sometimes to identify the app
     # Use "Referer" not "HTTP-Referer" - the OpenAI SDK will handle the HTTP- prefix
-    client = OpenAI(
+    return OpenAI(
         base_url="https://openrouter.ai/api/v1",
         api_key=OPENROUTER_API_KEY,
         default_headers={
@@ -55,51 +56,95 @@ def call_openrouter(model: str, system: str, tools_schema: list, tool_map: dict,
             "X-Title": "Value Investing Arena", # Site Title
         }
     )
+
+def _charge(cost: float):
+    global current_run_spend
+    current_run_spend += cost
+    if on_charge:
+        on_charge(cost)
+
+def call_openrouter(model: str, system: str, tools_schema: list, tool_map: dict, max_tokens: int = 4000):
+    global current_run_spend
+    
+    if current_run_spend >= MAX_DAILY_SPEND:
+        print(f"DAILY SPEND LIMIT REACHED (${current_run_spend:.4f} / ${MAX_DAILY_SPEND}). Stopping LLM calls.")
+        return "{}"
+
+    # Check if API key is set
+    if not OPENROUTER_API_KEY:
+        print("ERROR: OPENROUTER_API_KEY is not set!")
+        return "{}"
     
+    client = _client()
     messages = [
         {"role": "system", "content": system},
-        {"role": "user", "content": "Please review the portfolio and market conditions for today. Use your research tools to gather data, then output your analysis and trading decisions in the specified JSON format."}
+        {"role": "user", "content": REVIEW_REQUEST}
     ]
     
     # Tool loop
-    for _ in range(10): # Max 10 turns
+    for turn in range(10): # Max 10 turns
         if current_run_spend >= MAX_DAILY_SPEND:
              print("Limit reached during loop.")
              break
 
         try:
-            completion = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                tools=tools_schema,
-                max_tokens=max_tokens
-            )
+            emit("turn_start", model=model, turn=turn)
+            turn_started = time.perf_counter()
+            with span("llm_turn", category="llm", model=model, turn=turn) as info:
+                completion = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    tools=tools_schema,
+                    max_tokens=max_tokens
+                )
+                if completion.usage:
+                    info["prompt_tokens"] = completion.usage.prompt_tokens
+                    info["completion_tokens"] = completion.usage.completion_tokens
             
             # Estimate cost
             usage = completion.usage
+            cost = 0.0
             if usage:
                 cost = estimate_cost(model, usage.prompt_tokens, usage.completion_tokens)
-                current_run_spend += cost
+                _charge(cost)
                 print(f"  > Call cost: ${cost:.4f} | Total Run: ${current_run_spend:.4f}")
             
             message = completion.choices[0].message
             messages.append(message) # Add assistant message to history
+            emit(
+                "turn_end", model=model, turn=turn,
+                latency_ms=(time.perf_counter() - turn_started) * 1000,
+                prompt_tokens=usage.prompt_tokens if usage else None,
+                completion_tokens=usage.completion_tokens if usage else None,
+                cost=cost, run_spend=current_run_spend,
+                tool_calls=len(message.tool_calls or [])
+            )
             
             if message.tool_calls:
                 for tool_call in message.tool_calls:
                     function_name = tool_call.function.name
                     function_args = json.loads(tool_call.function.arguments)
                     
-                    if function_name in tool_map:
-                        print(f"Executing {function_name} with {function_args}")
-                        func = tool_map[function_name]
-                        try:
-                            result = func(**function_args)
-                            content = json.dumps(result, default=str)
-                        except Exception as e:
-                            content = f"Error executing {function_name}: {e}"
-                    else:
-                        content = f"Error: Tool {function_name} not found."
+                    tool_started = time.perf_counter()
+                    ok = False
+                    with span("tool_call", category="tool", model=model, tool=function_name) as info:
+                        if function_name in tool_map:
+                            print(f"Executing {function_name} with {function_args}")
+                            func = tool_map[function_name]
+                            try:
+                                result = func(**function_args)
+                                content = json.dumps(result, default=str)
+                                ok = True
+                            except Exception as e:
+                                content = f"Error executing {function_name}: {e}"
+                        else:
+                            content = f"Error: Tool {function_name} not found."
+                        info.update(ok=ok, bytes=len(content))
+                    emit(
+                        "tool_call", model=model, turn=turn, tool=function_name, args=function_args,
+                        latency_ms=(time.perf_counter() - tool_started) * 1000,
+                        ok=ok, response_bytes=len(content)
+                    )
                     
                     messages.append({
                         "tool_call_id": tool_call.id,
@@ -119,3 +164,62 @@ def call_openrouter(model: str, system: str, tools_schema: list, tool_map: dict,
     if len(messages) > 0 and hasattr(messages[-1], 'content'):
         return messages[-1].content
     return "{}"
+
+def call_openrouter_json(model: str, system: str, response_text: str, schema: dict, max_tokens: int = 2000):
+    """
+    Ask the model to restate the decision in `response_text` as one JSON
+    object, for answers the free-text extractor could not use. Tries
+    structured output against `schema` first, then plain JSON mode; OpenRouter
+    only routes to providers that support the requested response_format.
+
+    Returns:
+        The restated message content, or None if no mode was available or the
+        spend limit is reached
+    """
+    global current_run_spend
+    
+    if current_run_spend >= MAX_DAILY_SPEND or not OPENROUTER_API_KEY:
+        return None
+    
+    client = _client()
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": REVIEW_REQUEST},
+        {"role": "assistant", "content": response_text},
+        {"role": "user", "content": RESTATE_REQUEST}
+    ]
+    response_formats = [
+        {"type": "json_schema", "json_schema": {"name": "decision", "schema": schema}},
+        {"type": "json_object"}
+    ]
+    for response_format in response_formats:
+        try:
+            with span("llm_turn", category="llm", model=model, response_format=response_format["type"]) as info:
+                completion = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    response_format=response_format,
+                    max_tokens=max_tokens,
+                    extra_body={"provider": {"require_parameters": True}}
+                )
+                if completion.usage:
+                    info["prompt_tokens"] = completion.usage.prompt_tokens
+                    info["completion_tokens"] = completion.usage.completion_tokens
+        except Exception as e:
+            print(f"  > {response_format['type']} unavailable for {model}: {e}")
+            continue
+        
+        usage = completion.usage
+        cost = 0.0
+        if usage:
+            cost = estimate_cost(model, usage.prompt_tokens, usage.completion_tokens)
+            _charge(cost)
+            print(f"  > Call cost: ${cost:.4f} | Total Run: ${current_run_spend:.4f}")
+        emit(
+            "json_restate", model=model, response_format=response_format["type"],
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+            cost=cost, run_spend=current_run_spend
+        )
+        return completion.choices[0].message.content
+    return None
@@ -0,0 +1,80 @@
+from datetime import datetime
+from .config import MODELS
+from .portfolio import load_portfolio, save_portfolio, calculate_cash_balance, mark_position
+from .leaderboard import write_leaderboard_snapshot
+from .events import emit
+
+# Intraday revaluation between daily cycles: reprice every held position
+# from one batched quote request and move today's NAV point, without any
+# research or trading. Safe to repeat: the same prices give the same files,
+# and unchanged portfolios are not rewritten.
+
+def _revalue(portfolio: dict, quotes: dict):
+    """(positions, nav) for portfolio at quotes. Unquoted tickers keep their last value."""
+    positions = []
+    for pos in portfolio.get("positions", []):
+        price = (quotes.get(pos["ticker"]) or {}).get("price")
+        if not price:
+            shares = pos.get("shares", 0)
+            price = pos["market_value"] / shares if pos.get("market_value") and shares else pos.get("entry_price", 0)
+        positions.append(mark_position(pos, price))
+
+    cash = calculate_cash_balance(portfolio["model_id"])
+    nav = cash + sum(p["market_value"] for p in positions)
+    return positions, nav
+
+def mark_to_market(model_ids: list = None) -> list:
+    """
+    Reprice all held positions across models and update each portfolio's
+    positions and today's NAV point (added, or overwritten like update_nav).
+    Writes each changed portfolio once, then the leaderboard snapshot.
+
+    Returns:
+        [{"model", "nav", "positions", "unpriced", "updated"}] in MODELS order
+    """
+    from .broker import get_reference_quotes
+
+    if model_ids is None:
+        model_ids = [model["id"] for model in MODELS]
+    portfolios = [load_portfolio(model_id, readonly=True) for model_id in model_ids]
+    tickers = sorted({pos["ticker"] for portfolio in portfolios for pos in portfolio.get("positions", [])})
+    quotes = get_reference_quotes(tickers) if tickers else {}
+    unpriced = [ticker for ticker in tickers if not (quotes.get(ticker) or {}).get("price")]
+    if unpriced:
+        print(f"Warning: No price for {', '.join(unpriced)}; keeping last marks")
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    results = []
+    changed = False
+    for frozen in portfolios:
+        model_id = frozen["model_id"]
+        positions, nav = _revalue(frozen, quotes)
+        history = frozen.get("nav_history", [])
+        updated = positions != frozen.get("positions", []) or not history or \
+            history[-1].get("date") != today or history[-1].get("nav") != nav
+
+        if updated:
+            portfolio = load_portfolio(model_id)
+            portfolio["positions"] = positions
+            history = portfolio.get("nav_history", [])
+            if history and history[-1]["date"] == today:
+                history[-1]["nav"] = nav
+            else:
+                history.append({"date": today, "nav": nav})
+            portfolio["nav_history"] = history
+            save_portfolio(portfolio)
+            changed = True
+
+        results.append({
+            "model": model_id,
+            "nav": nav,
+            "positions": len(positions),
+            "unpriced": [pos["ticker"] for pos in positions if pos["ticker"] in unpriced],
+            "updated": updated
+        })
+
+    if changed:
+        write_leaderboard_snapshot()
+    emit("mark_to_market", tickers=len(tickers), unpriced=unpriced,
+         updated=[result["model"] for result in results if result["updated"]])
+    return results
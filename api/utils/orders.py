@@ -0,0 +1,355 @@
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .broker import (
+    execute_trade, get_account_credentials, get_order, cancel_order, get_reference_quotes, has_dedicated_account,
+    TERMINAL_ORDER_STATUSES
+)
+from .validation import validate_intents
+from .tracing import span
+
+# Net orders for different accounts are submitted concurrently
+MAX_PARALLEL_ACCOUNTS = 8
+
+# Fill reconciliation: poll open orders with exponential backoff until every
+# order is terminal or the deadline passes
+FILL_POLL_INITIAL_SECONDS = 0.5
+FILL_POLL_MAX_SECONDS = 8.0
+FILL_DEADLINE_SECONDS = 60.0
+
+def build_order_intents(model_id: str, trades: list, portfolio: dict) -> list:
+    """
+    Turn a model's parsed trades into order intents for the batch stage.
+    SELL "ALL" is resolved to the tracked share count; a SELL with a share
+    count is sent as a qty order.
+    """
+    held = {pos["ticker"]: pos.get("shares", 0) for pos in portfolio.get("positions", [])}
+    intents = []
+    for trade in trades:
+        ticker = trade.get("ticker")
+        side = (trade.get("action") or "").upper()
+        if not ticker or side not in ("BUY", "SELL"):
+            print(f"Warning: Skipping malformed trade from {model_id}: {trade}")
+            continue
+        qty = None
+        shares = trade.get("shares")
+        if side == "SELL" and shares == "ALL":
+            qty = held.get(ticker, 0)
+        elif side == "SELL" and shares:
+            try:
+                qty = float(shares)
+            except (ValueError, TypeError):
+                print(f"Warning: Ignoring invalid share count from {model_id}: {trade}")
+        intents.append({
+            "model_id": model_id,
+            "trade": trade,
+            "ticker": ticker,
+            "side": side,
+            "amount_usd": float(trade.get("amount_usd") or 0),
+            "qty": qty
+        })
+    return intents
+
+def _account_label(model_id: str) -> tuple:
+    # Models trading with the same credential pair share one account
+    return get_account_credentials(model_id)
+
+def net_intents(intents: list, prices: dict) -> list:
+    """
+    Group intents by (account, symbol) and net them into one order per group.
+
+    Each intent gets a signed notional at the reference price (BUY positive).
+    The group's net order is BUY or SELL for the absolute net amount, or no
+    order at all when the intents cancel out exactly. Groups made only of
+    share-quantity intents (SELL "ALL" or a share count) are netted in shares
+    instead and sent as a qty order, or as a close-position for a lone SELL
+    "ALL" when the model owns the whole account position.
+
+    Returns:
+        List of {"ticker", "side", "amount_usd", "qty", "price", "route_model_id", "intents"}
+    """
+    groups = {}
+    for intent in intents:
+        key = (_account_label(intent["model_id"]), intent["ticker"])
+        groups.setdefault(key, []).append(intent)
+
+    orders = []
+    for (_, ticker), group in groups.items():
+        price = prices.get(ticker)
+        net = 0.0
+        for intent in group:
+            notional = intent["amount_usd"]
+            if intent["qty"] is not None and price:
+                notional = intent["qty"] * price
+            intent["notional"] = notional
+            net += notional if intent["side"] == "BUY" else -notional
+
+        net = round(net, 2)  # Cent-level residue from float notionals is a cross, not an order
+        qty = None
+        direction = net
+        if all(intent["qty"] is not None for intent in group):
+            direction = sum(i["qty"] if i["side"] == "BUY" else -i["qty"] for i in group)
+            qty = abs(direction)
+            net = round(direction * (price or 0), 2)
+            if len(group) == 1 and group[0]["side"] == "SELL" and qty > 0 \
+                    and group[0]["trade"].get("shares") == "ALL" \
+                    and has_dedicated_account(group[0]["model_id"]):
+                qty = "ALL"
+        orders.append({
+            "ticker": ticker,
+            "side": "BUY" if direction > 0 else "SELL" if direction < 0 else None,
+            "amount_usd": abs(net),
+            "qty": qty,
+            "price": price,
+            "route_model_id": group[0]["model_id"],
+            "intents": group
+        })
+    return orders
+
+def client_order_id(order: dict, day: str) -> str:
+    """
+    Idempotency key for a net order: the same day, symbol and intents always
+    give the same key, so a retried cycle cannot place the order twice.
+    """
+    parts = sorted(
+        json.dumps([i["model_id"], i["side"], i["amount_usd"], i["qty"]]) for i in order["intents"]
+    )
+    digest = hashlib.sha256(json.dumps([day, order["ticker"], parts]).encode("utf-8")).hexdigest()
+    return f"va-{day}-{digest[:24]}"
+
+def _submit_account_orders(orders: list, submitted: dict) -> list:
+    results = []
+    for order in orders:
+        if order["qty"] is None and (order["amount_usd"] <= 0 or not order["price"]) or order["qty"] == 0:
+            results.append(None)
+            continue
+        with span("submit_order", category="broker", ticker=order["ticker"], side=order["side"],
+                  qty=order["qty"], amount_usd=order["amount_usd"]) as info:
+            if order["client_order_id"] in submitted:
+                # Sent by an earlier attempt of this cycle; pick up its state instead
+                info["resumed"] = True
+                result = get_order(submitted[order["client_order_id"]], order["route_model_id"])
+                result.setdefault("price", order["price"])
+                results.append(result)
+                continue
+            results.append(execute_trade(
+                ticker=order["ticker"],
+                side=order["side"],
+                amount_usd=order["amount_usd"],
+                model_id=order["route_model_id"],
+                price=order["price"],
+                qty=order["qty"],
+                client_order_id=order["client_order_id"]
+            ))
+    return results
+
+def reconcile_fills(orders: list, results: list, deadline_seconds: float = FILL_DEADLINE_SECONDS) -> list:
+    """
+    Poll every still-open order of the batch together until each one reaches
+    a terminal state or the deadline passes.
+
+    Args:
+        orders: Net orders, parallel to results
+        results: execute_trade results (None for orders never sent)
+
+    Returns:
+        Results updated with the latest broker state; "fill_confirmed" is True
+        for orders whose fill is final, "fill_pending" for orders the broker
+        still reported open after the remainder was canceled
+    """
+    results = list(results)
+    pending = {}
+    for i, (order, result) in enumerate(zip(orders, results)):
+        if not result or result.get("error") or not result.get("id"):
+            continue
+        if result.get("status") in TERMINAL_ORDER_STATUSES:
+            result["fill_confirmed"] = True
+        else:
+            pending[i] = order
+
+    deadline = time.monotonic() + deadline_seconds
+    delay = FILL_POLL_INITIAL_SECONDS
+    polls = 0
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_ACCOUNTS) as pool:
+        while pending and time.monotonic() < deadline:
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, FILL_POLL_MAX_SECONDS)
+            polls += 1
+
+            indices = list(pending)
+            updates = pool.map(
+                lambda i: get_order(results[i]["id"], pending[i]["route_model_id"]), indices
+            )
+            for i, update in zip(indices, updates):
+                if update.get("error"):
+                    continue  # Keep the last known state and retry next round
+                results[i] = dict(results[i], **{k: v for k, v in update.items() if v is not None})
+                if results[i].get("status") in TERMINAL_ORDER_STATUSES:
+                    results[i]["fill_confirmed"] = True
+                    del pending[i]
+
+    if pending:
+        # Cancel what is left so the book matches the broker, then take the
+        # final state. An order the broker still reports open is booked for
+        # what had filled so far ("fill_pending")
+        print(f"Warning: {len(pending)} orders still open after {deadline_seconds}s; canceling the remainder")
+        for i, order in pending.items():
+            cancel_order(results[i]["id"], order["route_model_id"])
+            update = get_order(results[i]["id"], order["route_model_id"])
+            if not update.get("error"):
+                results[i] = dict(results[i], **{k: v for k, v in update.items() if v is not None})
+            if results[i].get("status") in TERMINAL_ORDER_STATUSES:
+                results[i]["fill_confirmed"] = True
+            else:
+                results[i]["fill_pending"] = True
+    print(f"Reconciled {sum(1 for r in results if r and r.get('fill_confirmed'))} fills in {polls} polls")
+    return results
+
+def _intent_qty(intent: dict, price: float) -> float:
+    return intent["qty"] if intent["qty"] is not None else intent["notional"] / price
+
+def allocate_fill(order: dict, result: dict) -> list:
+    """
+    Split a net order's fill back across its intents at the shared fill price.
+
+    Returns:
+        List of (intent, per-model result dict) pairs ready for log_trades
+    """
+    fill_price = order["price"]
+    if result and not result.get("error") and result.get("filled_avg_price"):
+        fill_price = float(result["filled_avg_price"])
+
+    net_order = {
+        "id": result.get("id") if result else None,
+        "side": order["side"],
+        "amount_usd": order["amount_usd"],
+        "intents": len(order["intents"])
+    }
+
+    # Intents are sized in shares at the reference price the net order was
+    # sized at, and booked at the fill price. The broker's filled quantity is
+    # the account's actual change. Intents on the other side of the net order
+    # were crossed against the net side in full, so the net side as a whole
+    # received the broker fill plus the crossed quantity; that is split
+    # across its intents pro rata to what each intended. A partial fill (final, or whatever had
+    # filled of an order still open at the deadline) thus comes out of the
+    # net side only, and the books add up to exactly what the broker moved.
+    confirmed = bool(result and result.get("fill_confirmed"))
+    pending = bool(result and result.get("fill_pending"))
+    size_price = order["price"] or fill_price
+    scale = 1.0
+    if size_price and (confirmed or pending):
+        intended = sum(_intent_qty(i, size_price) for i in order["intents"] if i["side"] == order["side"])
+        crossed = sum(_intent_qty(i, size_price) for i in order["intents"] if i["side"] != order["side"])
+        if intended:
+            scale = max(float(result.get("filled_qty") or 0) + crossed, 0.0) / intended
+        if abs(scale - 1) < 1e-9:
+            scale = 1.0  # Full fill of a qty order: book the exact share counts
+
+    allocations = []
+    for intent in order["intents"]:
+        if result and result.get("error") or not fill_price:
+            error = result.get("error") if result else "Could not get price"
+            allocations.append((intent, {
+                "error": error, "symbol": intent["ticker"], "side": intent["side"], "net_order": net_order
+            }))
+            continue
+
+        qty = _intent_qty(intent, size_price)
+        allocations.append((intent, {
+            "id": net_order["id"],
+            "status": result.get("status") if result else "crossed",
+            "filled_qty": qty * scale if intent["side"] == order["side"] else qty,
+            "filled_avg_price": fill_price,
+            "qty": qty,
+            "price": order["price"],
+            "symbol": intent["ticker"],
+            "side": intent["side"],
+            "fill_confirmed": confirmed or result is None,
+            "fill_pending": pending,
+            "quote": order.get("quote"),
+            "net_order": net_order
+        }))
+    return allocations
+
+def execute_order_batch(intents: list, books: dict = None, day: str = None,
+                        submitted: dict = None, on_submitted=None) -> list:
+    """
+    Net every model's intended trades per account and symbol, send one order
+    per group, wait for the fills, and allocate each fill back to the models
+    at the fill price.
+
+    Intents that cancel out inside an account never reach the broker; they are
+    booked against each other at the reference price ("crossed").
+
+    Args:
+        intents: Order intents from build_order_intents
+        books: Optional {model_id: book} (see validation.build_book); when
+            given, intents failing pre-trade checks are not sent and come back
+            with a "rejected" result carrying the reason
+        day: Cycle date used in the orders' idempotency keys (default today)
+        submitted: {client_order_id: order id} sent by an earlier attempt of
+            this cycle; those orders are looked up rather than sent again
+        on_submitted: Optional callback receiving {client_order_id: order id}
+            for every order sent, called before waiting for fills
+
+    Returns:
+        List of (intent, result) pairs in the order the intents were given
+    """
+    if not intents:
+        return []
+
+    # One reference quote per symbol for the whole batch, in a single request
+    with span("quotes", category="broker") as info:
+        quotes = get_reference_quotes(sorted({intent["ticker"] for intent in intents}))
+        info["symbols"] = len(quotes)
+    prices = {ticker: quote["price"] for ticker, quote in quotes.items()}
+
+    rejected = []
+    if books is not None:
+        with span("validate", intents=len(intents)) as info:
+            intents_to_send, rejected = validate_intents(intents, books, prices)
+            info["rejected"] = len(rejected)
+    else:
+        intents_to_send = intents
+
+    orders = net_intents(intents_to_send, prices)
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    for order in orders:
+        order["quote"] = {k: quotes[order["ticker"]].get(k) for k in ("source", "timestamp", "price")}
+        order["client_order_id"] = client_order_id(order, day)
+    print(f"Order batch: {len(intents_to_send)} intents netted into "
+          f"{sum(1 for o in orders if o['side'])} orders ({len(rejected)} rejected)")
+
+    by_account = {}
+    for order in orders:
+        by_account.setdefault(_account_label(order["route_model_id"]), []).append(order)
+
+    account_orders = list(by_account.values())
+    with ThreadPoolExecutor(max_workers=max(min(MAX_PARALLEL_ACCOUNTS, len(account_orders)), 1)) as pool:
+        account_results = list(pool.map(lambda group: _submit_account_orders(group, submitted or {}), account_orders))
+
+    sent = [order for group in account_orders for order in group]
+    results = [r for group in account_results for r in group]
+    if on_submitted:
+        on_submitted({
+            order["client_order_id"]: result["id"]
+            for order, result in zip(sent, results) if result and result.get("id")
+        })
+
+    with span("reconcile_fills", category="broker", orders=len(sent)):
+        results = reconcile_fills(sent, results)
+
+    allocated = {}
+    for order, result in zip(sent, results):
+        for intent, intent_result in allocate_fill(order, result):
+            allocated[id(intent)] = intent_result
+    for intent, reason in rejected:
+        allocated[id(intent)] = {
+            "error": reason, "rejected": True, "symbol": intent["ticker"], "side": intent["side"],
+            "quote": {k: quotes[intent["ticker"]].get(k) for k in ("source", "timestamp", "price")}
+        }
+
+    return [(intent, allocated[id(intent)]) for intent in intents]
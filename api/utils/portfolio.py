@@ -1,8 +1,12 @@
+import contextlib
+import hashlib
 import json
 import os
 import tempfile
+import threading
 from datetime import datetime
 from .config import MODELS
+from .tracing import span
 
 # Use persistent directory for GitHub Actions (data/portfolios)
 # Falls back to temp directory for local development
@@ -12,6 +16,9 @@ else:
     # Local development: use temp directory
     DATA_DIR = os.path.join(tempfile.gettempdir(), "value_arena_data")
 
+# A sell leaving fewer shares than this closes the position (float residue)
+SHARE_DUST = 1e-9
+
 def ensure_data_dir():
     if not os.path.exists(DATA_DIR):
         try:
@@ -19,17 +26,118 @@ def ensure_data_dir():
         except Exception as e:
             print(f"Warning: Could not create data dir {DATA_DIR}: {e}")
 
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = "w"):
+    """
+    Write to a temp file and rename it over `path`, so concurrent readers see
+    either the old file or the new one, never a partial write.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def get_portfolio_path(model_id: str) -> str:
     ensure_data_dir()
     safe_id = model_id.replace("/", "_")
     return os.path.join(DATA_DIR, f"{safe_id}.json")
 
-def load_portfolio(model_id: str) -> dict:
+# Precomputed per-model summaries, kept next to the portfolio files so the
+# leaderboard never has to parse full documents
+INDEX_FILENAME = "_index.json"
+
+SUMMARY_FIELDS = [
+    "model_id", "starting_capital", "nav", "nav_date", "positions",
+    "position_count", "trade_count", "research_log_count", "last_trade_date",
+    "nav_history"
+]
+DEFAULT_SUMMARY_FIELDS = [f for f in SUMMARY_FIELDS if f != "nav_history"]
+
+# Append-only sections mirrored to JSON Lines sidecars for paginated reads
+PAGED_SECTIONS = ["trade_history", "research_logs"]
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 200
+
+def get_section_path(model_id: str, section: str) -> str:
+    ensure_data_dir()
+    safe_id = model_id.replace("/", "_")
+    return os.path.join(DATA_DIR, f"{safe_id}.{section}.jsonl")
+
+class FrozenDict(dict):
+    """Read-only dict handed out from the portfolio cache."""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached portfolio is read-only; load it with readonly=False to modify")
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+class FrozenList(list):
+    """Read-only list handed out from the portfolio cache."""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached portfolio is read-only; load it with readonly=False to modify")
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = clear = extend = insert = pop = remove = reverse = sort = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return FrozenDict((k, _freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return FrozenList(_freeze(v) for v in obj)
+    return obj
+
+def _thaw(obj):
+    """Mutable copy of a frozen document. Containers are copied, leaves are shared."""
+    if isinstance(obj, dict):
+        return {k: _thaw(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_thaw(v) for v in obj]
+    return obj
+
+# Parsed portfolio documents keyed by path, valid while (mtime_ns, size) match
+_portfolio_cache = {}
+_portfolio_cache_lock = threading.Lock()
+
+def invalidate_portfolio_cache(model_id: str = None):
+    """Drop one model's cached document, or all of them."""
+    with _portfolio_cache_lock:
+        if model_id is None:
+            _portfolio_cache.clear()
+        else:
+            _portfolio_cache.pop(get_portfolio_path(model_id), None)
+
+def load_portfolio(model_id: str, readonly: bool = False) -> dict:
+    """
+    Load a model's portfolio, parsing the file only if it changed since the
+    last load in this process.
+
+    Args:
+        model_id: Model to load
+        readonly: Return the shared cached document itself (mutation raises
+            TypeError) instead of a private mutable copy. Use for read paths.
+    """
     try:
         path = get_portfolio_path(model_id)
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                return json.load(f)
+        signature = _stat_signature(path)
+        if signature:
+            with _portfolio_cache_lock:
+                cached = _portfolio_cache.get(path)
+            if cached and cached[0] == signature:
+                document = cached[1]
+            else:
+                with open(path, "r") as f:
+                    document = _freeze(json.load(f))
+                with _portfolio_cache_lock:
+                    _portfolio_cache[path] = (signature, document)
+            return document if readonly else _thaw(document)
     except Exception as e:
         print(f"Error loading portfolio {model_id}: {e}")
     
@@ -46,16 +154,379 @@ def load_portfolio(model_id: str) -> dict:
 def save_portfolio(portfolio: dict):
     try:
         path = get_portfolio_path(portfolio["model_id"])
-        with open(path, "w") as f:
-            json.dump(portfolio, f, indent=4)
+        with span("save_portfolio", category="io", model=portfolio["model_id"]) as info:
+            encoded = json.dumps(portfolio, indent=4).encode("utf-8")
+            with atomic_write(path, "wb") as f:
+                f.write(encoded)
+            info["bytes"] = len(encoded)
+            invalidate_portfolio_cache(portfolio["model_id"])
+            # Hash what we just wrote rather than reading it back
+            update_portfolio_index(portfolio, hashlib.sha256(encoded).hexdigest())
     except Exception as e:
         print(f"Error saving portfolio {portfolio['model_id']}: {e}")
 
+def build_portfolio_summary(portfolio: dict) -> dict:
+    """Summary entry for the index: everything the leaderboard needs, no logs."""
+    nav_history = portfolio.get("nav_history", [])
+    trades = portfolio.get("trade_history", [])
+    latest = nav_history[-1] if nav_history else {}
+    return {
+        "model_id": portfolio["model_id"],
+        "starting_capital": portfolio.get("starting_capital", 10000),
+        "nav": latest.get("nav", portfolio.get("starting_capital", 10000)),
+        "nav_date": latest.get("date"),
+        "positions": portfolio.get("positions", []),
+        "position_count": len(portfolio.get("positions", [])),
+        "trade_count": len(trades),
+        "research_log_count": len(portfolio.get("research_logs", [])),
+        "last_trade_date": trades[-1].get("date") if trades else None,
+        "nav_history": nav_history
+    }
+
+# Guards load-modify-save of the index within a process (threaded dev
+# server, concurrent cycle stages)
+_index_lock = threading.Lock()
+
+# The append-only sidecars are fingerprinted by size plus a hash of their
+# last bytes, so saving a long history does not mean reading it all back
+SIDECAR_HASH_TAIL = 64 * 1024
+
+def _stat_signature(path: str):
+    """(mtime_ns, size) of a file: the cheap change check for the parsed-document cache."""
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def _file_signature(path: str, tail: int = None, sha256: str = None):
+    """
+    {"size", "mtime_ns", "sha256"} of a file, used to detect index entries
+    gone stale. The hash keeps an entry valid across a git checkout, which
+    changes mtimes but not contents. With tail, only the last tail bytes are
+    hashed (recorded as "tail"). A caller that just wrote the file can pass
+    its sha256 to skip reading it back.
+    """
+    try:
+        stat = os.stat(path)
+        digest = sha256
+        if digest is None:
+            with open(path, "rb") as f:
+                if tail is not None:
+                    f.seek(max(stat.st_size - tail, 0))
+                digest = hashlib.sha256(f.read()).hexdigest()
+        signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        if tail is not None:
+            signature["tail"] = tail
+        return signature
+    except OSError:
+        return None
+
+def _check_signature(path: str, signature):
+    """
+    "same" if the file is untouched (only a stat()), "moved" if just its
+    mtime changed but the hash still matches (the signature's mtime is then
+    updated in place, for the caller to write back), None if it changed.
+    """
+    if not isinstance(signature, dict):
+        return None  # No file then, or an entry from an older index format
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if stat.st_size != signature.get("size"):
+        return None
+    if stat.st_mtime_ns == signature.get("mtime_ns"):
+        return "same"
+    current = _file_signature(path, signature.get("tail"))
+    if current is None or current["sha256"] != signature.get("sha256"):
+        return None
+    signature["mtime_ns"] = current["mtime_ns"]
+    return "moved"
+
+def load_portfolio_index() -> dict:
+    ensure_data_dir()
+    path = os.path.join(DATA_DIR, INDEX_FILENAME)
+    try:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Error loading portfolio index: {e}")
+    return {}
+
+def save_portfolio_index(index: dict):
+    try:
+        path = os.path.join(DATA_DIR, INDEX_FILENAME)
+        with atomic_write(path) as f:
+            json.dump(index, f)
+    except Exception as e:
+        print(f"Error saving portfolio index: {e}")
+
+def _encode_entry(entry) -> bytes:
+    return json.dumps(entry, default=str).encode("utf-8") + b"\n"
+
+def _section_digest(entries: list) -> str:
+    """sha256 of a section's entries, recorded with the sidecar that mirrors them."""
+    return hashlib.sha256(json.dumps(entries, default=str).encode("utf-8")).hexdigest()
+
+def _sidecar_extends(path: str, previous: dict, entries: list) -> bool:
+    """
+    True if the sidecar on disk is still the one previous describes and
+    holds entries[:count] unchanged (an edit anywhere in them changes the
+    digest), so the remaining entries can just be appended.
+    """
+    if not previous or previous.get("count", 0) > len(entries):
+        return False
+    if _check_signature(path, previous.get("signature")) is None:
+        return False
+    return previous.get("digest") == _section_digest(entries[:previous["count"]])
+
+def write_section_logs(portfolio: dict, previous: dict = None) -> dict:
+    """
+    Mirror each paged section to a JSON Lines sidecar, one entry per line in
+    chronological order. Entries past what the previous index entry
+    recorded are appended; the file is only rewritten in full when it no
+    longer matches that record.
+
+    Args:
+        previous: The model's current index "sections", if any
+
+    Returns:
+        Dict of section -> {"signature", "count", "digest"} for the index
+    """
+    sections = {}
+    for section in PAGED_SECTIONS:
+        path = get_section_path(portfolio["model_id"], section)
+        entries = portfolio.get(section, [])
+        prior = (previous or {}).get(section)
+        if _sidecar_extends(path, prior, entries):
+            if prior["count"] == len(entries):
+                sections[section] = prior
+                continue
+            # Readers stop at the size in the index, so they never see a
+            # half-written line
+            with open(path, "ab") as f:
+                for entry in entries[prior["count"]:]:
+                    f.write(_encode_entry(entry))
+        else:
+            with atomic_write(path, "wb") as f:
+                for entry in entries:
+                    f.write(_encode_entry(entry))
+        sections[section] = {
+            "signature": _file_signature(path, SIDECAR_HASH_TAIL),
+            "count": len(entries),
+            "digest": _section_digest(entries)
+        }
+    return sections
+
+def _build_index_entry(portfolio: dict, previous: dict = None, sha256: str = None) -> dict:
+    model_id = portfolio["model_id"]
+    return {
+        "signature": _file_signature(get_portfolio_path(model_id), sha256=sha256),
+        "sections": write_section_logs(portfolio, (previous or {}).get("sections")),
+        "summary": build_portfolio_summary(portfolio)
+    }
+
+def _index_entry_state(model_id: str, entry: dict):
+    """"same", "moved" (contents unchanged, mtimes refreshed) or None if the entry is stale."""
+    if not entry:
+        return None
+    paths = [(get_portfolio_path(model_id), entry.get("signature"))]
+    sections = entry.get("sections", {})
+    for section in PAGED_SECTIONS:
+        if section not in sections:
+            return None
+        paths.append((get_section_path(model_id, section), sections[section]["signature"]))
+    states = [_check_signature(path, signature) for path, signature in paths]
+    if None in states:
+        return None
+    return "moved" if "moved" in states else "same"
+
+def _entry_contents(entry):
+    """Hashes of the files an index entry describes, ignoring mtimes."""
+    try:
+        return [entry["signature"]["sha256"]] + [entry["sections"][s]["signature"]["sha256"] for s in PAGED_SECTIONS]
+    except (KeyError, TypeError):
+        return None
+
+def update_portfolio_index(portfolio: dict, sha256: str = None):
+    """
+    Refresh one model's index entry and sidecars. Called on every save, with
+    the hash of the document just written.
+    """
+    with _index_lock:
+        index = load_portfolio_index()
+        index[portfolio["model_id"]] = _build_index_entry(portfolio, index.get(portfolio["model_id"]), sha256)
+        save_portfolio_index(index)
+
+def get_index_entries(model_ids: list) -> list:
+    """
+    Fresh index entries for the given models.
+
+    Only a stat() per file is needed on the hot path. After a checkout (new
+    mtimes, same contents) the files are hashed once and the entries kept.
+    Entries that are missing or whose files really changed outside
+    save_portfolio are rebuilt from the full document. Either way the index
+    is written back.
+    """
+    index = load_portfolio_index()
+    entries = []
+    changed = {}
+    for model_id in model_ids:
+        entry = index.get(model_id)
+        original = _entry_contents(entry)
+        state = _index_entry_state(model_id, entry)
+        if state is None:
+            entry = _build_index_entry(load_portfolio(model_id, readonly=True), entry)
+        if state != "same":
+            changed[model_id] = (original, entry)
+        entries.append(entry)
+
+    if changed:
+        with _index_lock:
+            # Re-read, and keep any entry another writer saved since we loaded
+            latest = load_portfolio_index()
+            for model_id, (original, entry) in changed.items():
+                if _entry_contents(latest.get(model_id)) == original:
+                    latest[model_id] = entry
+            save_portfolio_index(latest)
+    return entries
+
+def get_portfolio_summaries(fields: list = None, model_ids: list = None) -> list:
+    """
+    Per-model summaries served from the precomputed index.
+
+    Args:
+        fields: Summary fields to return (defaults to DEFAULT_SUMMARY_FIELDS)
+        model_ids: Models to include (defaults to all)
+    """
+    if fields is None:
+        fields = DEFAULT_SUMMARY_FIELDS
+    fields = [f for f in fields if f in SUMMARY_FIELDS]
+    if model_ids is None:
+        model_ids = [model["id"] for model in MODELS]
+
+    return [
+        {f: entry["summary"].get(f) for f in fields}
+        for entry in get_index_entries(model_ids)
+    ]
+
+def _iter_lines_reverse(path: str, end_offset: int, block_size: int = 65536):
+    """Yield (offset, line) pairs from the line ending at end_offset backwards."""
+    with open(path, "rb") as f:
+        pos = end_offset
+        tail = b""
+        while pos > 0:
+            read = min(block_size, pos)
+            pos -= read
+            f.seek(pos)
+            chunk = f.read(read) + tail
+            lines = chunk.split(b"\n")
+            end = pos + len(chunk)
+            for line in reversed(lines[1:]):
+                start = end - len(line)
+                if line:
+                    yield start, line
+                end = start - 1
+            tail = lines[0]
+        if tail:
+            yield 0, tail
+
+def _parse_cursor(before):
+    """A cursor is "<seq>:<byte offset>" as returned in next_before, or a bare seq."""
+    if before is None or before == "":
+        return None, None
+    seq, _, offset = str(before).partition(":")
+    try:
+        seq, offset = int(seq), (int(offset) if offset else None)
+    except ValueError:
+        seq = -1
+    if seq < 0 or offset is not None and offset < 0:
+        raise ValueError(f"Invalid cursor {before!r}, expected next_before from a previous page")
+    return seq, offset
+
+def get_portfolio_page(model_id: str, section: str, limit: int = DEFAULT_PAGE_LIMIT, before=None) -> dict:
+    """
+    One page of trade_history or research_logs, newest first, read from the
+    section's sidecar without loading the full portfolio document.
+
+    Args:
+        model_id: Model to read
+        section: "trade_history" or "research_logs"
+        limit: Page size (capped at MAX_PAGE_LIMIT)
+        before: Cursor from a previous page's next_before; omit for the latest page
+
+    Returns:
+        {"model_id", "section", "total", "items", "next_before"}; next_before is
+        None on the last page
+
+    Raises:
+        ValueError: On an unknown section, or a limit or cursor that is not a number
+    """
+    if section not in PAGED_SECTIONS:
+        raise ValueError(f"Unknown section {section}, expected one of {PAGED_SECTIONS}")
+    try:
+        limit = max(1, min(int(limit), MAX_PAGE_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit {limit!r}, expected an integer")
+
+    entry = get_index_entries([model_id])[0]
+    total = entry["sections"][section]["count"]
+    path = get_section_path(model_id, section)
+
+    seq, offset = _parse_cursor(before)
+    if seq is None or seq > total:
+        seq, offset = total, None
+    if offset is not None:
+        # A stale or hand-made offset must land on a line boundary
+        with open(path, "rb") as f:
+            if offset > 0:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    offset = None
+
+    items = []
+    oldest_offset = None
+    if seq > 0:
+        if offset is None:
+            # Only a seq: walk back from the end past the newer entries
+            lines = _iter_lines_reverse(path, entry["sections"][section]["signature"]["size"])
+            for _ in range(total - seq):
+                next(lines, None)
+        else:
+            lines = _iter_lines_reverse(path, offset)
+        for line_offset, line in lines:
+            items.append(json.loads(line))
+            oldest_offset = line_offset
+            if len(items) >= limit:
+                break
+
+    first_seq = seq - len(items)
+    return {
+        "model_id": model_id,
+        "section": section,
+        "total": total,
+        "items": items,
+        "next_before": f"{first_seq}:{oldest_offset}" if items and first_seq > 0 else None
+    }
+
+def is_unfilled(result) -> bool:
+    """
+    True for a trade result that moved no shares: rejected pre-trade, failed
+    at submission or at the broker, or closed (or left open) without a fill.
+    """
+    if not isinstance(result, dict):
+        return False
+    if result.get("rejected") or result.get("error"):
+        return True
+    return bool((result.get("fill_confirmed") or result.get("fill_pending")) and not result.get("filled_qty"))
+
 def calculate_cash_balance(model_id: str) -> float:
     """
     Calculate cash balance from trade history.
     """
-    portfolio = load_portfolio(model_id)
+    portfolio = load_portfolio(model_id, readonly=True)
     starting_capital = portfolio.get("starting_capital", 10000)
     cash = starting_capital
     
@@ -67,8 +538,14 @@ def calculate_cash_balance(model_id: str) -> float:
         # Try to get actual trade value from result
         result = trade.get("result", "")
         if isinstance(result, dict):
+            # is_unfilled, inlined: this loop runs over the whole history
+            if result.get("rejected") or result.get("error"):
+                continue
+            filled_qty = result.get("filled_qty")
+            if not filled_qty and (result.get("fill_confirmed") or result.get("fill_pending")):
+                continue
             filled_price = result.get("filled_avg_price") or result.get("price")
-            filled_qty = result.get("filled_qty") or result.get("qty")
+            filled_qty = filled_qty or result.get("qty")
             if filled_price and filled_qty:
                 amount_usd = float(filled_price) * float(filled_qty)
         
@@ -79,6 +556,20 @@ def calculate_cash_balance(model_id: str) -> float:
     
     return cash
 
+def mark_position(pos: dict, current_price: float) -> dict:
+    """A position valued at current_price: market_value and unrealized P&L."""
+    shares = pos.get("shares", 0)
+    entry_price = pos.get("entry_price", current_price)
+    return {
+        "ticker": pos["ticker"],
+        "shares": shares,
+        "entry_price": entry_price,
+        "market_value": shares * current_price,
+        "unrealized_pnl": (current_price - entry_price) * shares,
+        "unrealized_pnl_pct": ((current_price - entry_price) / entry_price) * 100 if entry_price > 0 else 0,
+        "thesis": pos.get("thesis", "")
+    }
+
 def calculate_nav_from_positions(model_id: str) -> float:
     """
     Calculate NAV from tracked positions and cash.
@@ -86,33 +577,17 @@ def calculate_nav_from_positions(model_id: str) -> float:
     """
     portfolio = load_portfolio(model_id)
     
-    # Update position prices
+    # Update position prices: one batched quote request through the order
+    # broker, so a BROKER=sim cycle stays offline
     try:
-        from .research import get_price
+        from .broker import get_reference_quotes
         
+        positions = portfolio.get("positions", [])
+        quotes = get_reference_quotes([pos["ticker"] for pos in positions], model_id) if positions else {}
         updated_positions = []
-        for pos in portfolio.get("positions", []):
-            ticker = pos["ticker"]
-            shares = pos.get("shares", 0)
-            
-            # Get current price
-            price_data = get_price(ticker)
-            current_price = price_data.get("price", pos.get("entry_price", 0))
-            
-            entry_price = pos.get("entry_price", current_price)
-            market_value = shares * current_price
-            unrealized_pnl = (current_price - entry_price) * shares
-            unrealized_pnl_pct = ((current_price - entry_price) / entry_price) * 100 if entry_price > 0 else 0
-            
-            updated_positions.append({
-                "ticker": ticker,
-                "shares": shares,
-                "entry_price": entry_price,
-                "market_value": market_value,
-                "unrealized_pnl": unrealized_pnl,
-                "unrealized_pnl_pct": unrealized_pnl_pct,
-                "thesis": pos.get("thesis", "")
-            })
+        for pos in positions:
+            current_price = (quotes.get(pos["ticker"]) or {}).get("price") or pos.get("entry_price", 0)
+            updated_positions.append(mark_position(pos, current_price))
         
         portfolio["positions"] = updated_positions
         save_portfolio(portfolio)
@@ -129,6 +604,7 @@ def calculate_nav_from_positions(model_id: str) -> float:
 def update_nav(model_id: str, nav_value: float = None):
     """
     Update NAV for a model. If nav_value is None, calculates from positions.
+    Returns the NAV recorded for today.
     """
     portfolio = load_portfolio(model_id)
     today = datetime.now().strftime("%Y-%m-%d")
@@ -145,6 +621,7 @@ def update_nav(model_id: str, nav_value: float = None):
     
     portfolio["nav_history"] = history
     save_portfolio(portfolio)
+    return nav_value
 
 def update_position_after_trade(portfolio: dict, trade: dict, result: dict, current_price: float):
     """
@@ -224,7 +701,7 @@ def update_position_after_trade(portfolio: dict, trade: dict, result: dict, curr
             old_pos = portfolio["positions"][position_index]
             old_shares = old_pos["shares"]
             
-            if shares >= old_shares:
+            if shares >= old_shares - SHARE_DUST:
                 # Selling all or more - remove position
                 portfolio["positions"].pop(position_index)
             else:
@@ -244,15 +721,20 @@ def update_position_after_trade(portfolio: dict, trade: dict, result: dict, curr
     
     # Don't save here - caller will save
 
-def log_trade(model_id: str, trade: dict, result: dict):
-    """
-    Log a trade and update positions.
-    """
-    portfolio = load_portfolio(model_id)
-    
+def _book_trade(portfolio: dict, trade: dict, result: dict):
+    """Apply one executed trade to positions and append it to trade_history."""
     # Extract price BEFORE storing (since we need it for position update)
     ticker = trade.get("ticker")
     current_price = None
+
+    # A reconciled fill books the broker's share count (for an order still
+    # open at the reconcile deadline, what had filled by then); an order that
+    # never filled, was rejected or failed books nothing
+    booked = trade
+    if isinstance(result, dict) and (result.get("fill_confirmed") or result.get("fill_pending")):
+        booked = dict(trade, shares=float(result.get("filled_qty") or 0))
+    if is_unfilled(result):
+        booked = dict(trade, shares=0)
     
     # Try to get price from Alpaca result
     if isinstance(result, dict):
@@ -268,11 +750,10 @@ def log_trade(model_id: str, trade: dict, result: dict):
                 pass
     
     # If no price in result, fetch current price
-    if not current_price:
+    if not current_price and booked.get("shares") != 0:
         try:
-            from .research import get_price
-            price_data = get_price(ticker)
-            current_price = price_data.get("price")
+            from .broker import get_reference_quotes
+            current_price = get_reference_quotes([ticker], portfolio["model_id"])[ticker].get("price")
         except Exception as e:
             print(f"Warning: Could not get price for {ticker}: {e}")
             # Fallback: estimate from amount_usd
@@ -287,8 +768,10 @@ def log_trade(model_id: str, trade: dict, result: dict):
                     pass
     
     # Update positions BEFORE saving trade record
-    if current_price and current_price > 0:
-        update_position_after_trade(portfolio, trade, result, current_price)
+    if booked.get("shares") == 0:
+        print(f"Note: {ticker} order was not filled, no position change")
+    elif current_price and current_price > 0:
+        update_position_after_trade(portfolio, booked, result, current_price)
     else:
         print(f"Warning: Could not determine price for {ticker}, skipping position update")
     
@@ -298,8 +781,25 @@ def log_trade(model_id: str, trade: dict, result: dict):
     trade_record["result"] = result if isinstance(result, dict) else {"raw": str(result)}  # Store as dict
     
     portfolio["trade_history"].append(trade_record)
+
+def log_trades(model_id: str, entries: list):
+    """
+    Log several (trade, result) pairs and update positions with a single
+    load and save of the portfolio.
+    """
+    if not entries:
+        return
+    portfolio = load_portfolio(model_id)
+    for trade, result in entries:
+        _book_trade(portfolio, trade, result)
     save_portfolio(portfolio)
 
+def log_trade(model_id: str, trade: dict, result: dict):
+    """
+    Log a trade and update positions.
+    """
+    log_trades(model_id, [(trade, result)])
+
 def save_research_log(model_id: str, notes: str):
     portfolio = load_portfolio(model_id)
     portfolio["research_logs"].append({
@@ -309,7 +809,8 @@ def save_research_log(model_id: str, notes: str):
     save_portfolio(portfolio)
 
 def get_all_portfolios():
+    """Read-only views of every model's portfolio (see load_portfolio)."""
     portfolios = []
     for model in MODELS:
-        portfolios.append(load_portfolio(model["id"]))
+        portfolios.append(load_portfolio(model["id"], readonly=True))
     return portfolios
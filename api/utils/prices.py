@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import numpy as np
+from datetime import datetime, timedelta
+
+# Local cache of daily closes, one columnar JSON file per ticker.
+# Mirrors the DATA_DIR layout in portfolio.py.
+if os.environ.get("GITHUB_ACTIONS"):
+    PRICE_DIR = os.path.join(os.getcwd(), "data", "prices")
+else:
+    PRICE_DIR = os.path.join(tempfile.gettempdir(), "value_arena_prices")
+
+# How far back to re-fetch when topping up a cache (covers late corrections)
+REFRESH_OVERLAP_DAYS = 5
+
+def ensure_price_dir():
+    if not os.path.exists(PRICE_DIR):
+        try:
+            os.makedirs(PRICE_DIR)
+        except Exception as e:
+            print(f"Warning: Could not create price dir {PRICE_DIR}: {e}")
+
+def get_price_cache_path(ticker: str) -> str:
+    ensure_price_dir()
+    return os.path.join(PRICE_DIR, f"{ticker.upper()}.json")
+
+def load_cached_closes(ticker: str) -> dict:
+    """Cached {"ticker", "covered_from", "fetched", "dates", "closes"} for a ticker, or an empty record."""
+    path = get_price_cache_path(ticker)
+    try:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Error loading cached prices for {ticker}: {e}")
+    return {"ticker": ticker.upper(), "covered_from": None, "fetched": None, "dates": [], "closes": []}
+
+def save_cached_closes(record: dict):
+    try:
+        path = get_price_cache_path(record["ticker"])
+        with open(path, "w") as f:
+            json.dump(record, f)
+    except Exception as e:
+        print(f"Error saving cached prices for {record['ticker']}: {e}")
+
+def fetch_daily_closes(ticker: str, start: str) -> dict:
+    """Daily closes from yfinance as {date: close}, or None if the fetch failed."""
+    try:
+        import yfinance as yf
+        hist = yf.Ticker(ticker).history(start=start, auto_adjust=False)
+        return {
+            d.strftime("%Y-%m-%d"): float(close)
+            for d, close in zip(hist.index, hist["Close"])
+            if close == close  # Drop NaN rows
+        }
+    except Exception as e:
+        print(f"Error fetching daily closes for {ticker}: {e}")
+        return None
+
+def get_daily_closes(ticker: str, start: str, refresh: bool = True):
+    """
+    Daily closes for a ticker from `start` onwards, served from the local cache.
+    The cache is topped up from yfinance at most once per day, or extended
+    backwards when `start` predates what it covers. With refresh=False only
+    the cache is read.
+
+    Returns:
+        (dates, closes) as datetime64[D] and float64 arrays
+    """
+    record = load_cached_closes(ticker)
+    today = datetime.now().strftime("%Y-%m-%d")
+    start = start[:10]
+
+    if refresh:
+        fetch_from = None
+        covered_from = record.get("covered_from")
+        if not covered_from or start < covered_from:
+            fetch_from = start
+        elif record.get("fetched") != today:
+            last = record["dates"][-1] if record["dates"] else covered_from
+            overlap = datetime.strptime(last, "%Y-%m-%d") - timedelta(days=REFRESH_OVERLAP_DAYS)
+            fetch_from = max(overlap.strftime("%Y-%m-%d"), covered_from)
+
+        fetched = fetch_daily_closes(ticker, fetch_from) if fetch_from else None
+        if fetched is not None:
+            merged = dict(zip(record["dates"], record["closes"]))
+            merged.update(fetched)
+            record["dates"] = sorted(merged)
+            record["closes"] = [merged[d] for d in record["dates"]]
+            record["covered_from"] = min(start, covered_from) if covered_from else start
+            record["fetched"] = today
+            save_cached_closes(record)
+
+    all_dates = np.array(record["dates"], dtype="datetime64[D]")
+    closes = np.array(record["closes"], dtype=float)
+    keep = all_dates >= np.datetime64(start, "D")
+    return all_dates[keep], closes[keep]
+
+def align_closes(calendar: np.ndarray, dates: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """
+    As-of closes on the calendar: the last close on or before each day.
+    Days before the first close are NaN.
+    """
+    out = np.full(len(calendar), np.nan)
+    if len(dates) == 0:
+        return out
+    pos = np.searchsorted(dates, calendar, side="right") - 1
+    valid = pos >= 0
+    out[valid] = closes[pos[valid]]
+    return out
+
+def load_price_matrix(tickers: list, start: str, calendar: np.ndarray = None, refresh: bool = True):
+    """
+    (tickers x days) matrix of as-of daily closes.
+
+    If no calendar is given, it is the union of every trading day in the
+    cache for these tickers from `start`. Leading gaps (the only gaps after
+    as-of alignment) are backfilled with the first known close; tickers with
+    no data at all are left as NaN for the caller to handle.
+
+    Returns:
+        (calendar, matrix)
+    """
+    series = [get_daily_closes(ticker, start, refresh=refresh) for ticker in tickers]
+    if calendar is None:
+        all_dates = [dates for dates, _ in series]
+        calendar = np.unique(np.concatenate(all_dates)) if all_dates else np.array([], dtype="datetime64[D]")
+
+    matrix = np.full((len(tickers), len(calendar)), np.nan)
+    for i, (dates, closes) in enumerate(series):
+        row = align_closes(calendar, dates, closes)
+        known = ~np.isnan(row)
+        if known.any():
+            row[~known] = row[known][0]
+        matrix[i] = row
+    return calendar, matrix
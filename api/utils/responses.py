@@ -0,0 +1,162 @@
+import json
+import zlib
+
+# Encoded output is flushed to the compressor / socket in chunks of this size
+CHUNK_SIZE = 64 * 1024
+# Uncompressed bodies up to this size are buffered so they get a Content-Length;
+# anything larger is streamed and delimited by closing the connection
+MAX_BUFFERED_IDENTITY = 1024 * 1024
+# Containers are split this many levels deep (all portfolios -> portfolio ->
+# trade_history); everything below is encoded in one json.dumps call
+STREAM_DEPTH = 3
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+def parse_accept_encoding(header: str) -> dict:
+    """Accept-Encoding header as {coding: q}."""
+    codings = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding] = q
+    return codings
+
+def negotiate_encoding(header: str, available: tuple = ("br", "gzip")) -> str:
+    """
+    Pick the best content coding we can produce for an Accept-Encoding header:
+    the highest q the client gives, and among equal q the first in available.
+    Brotli is only offered when the optional brotli package is installed.
+    """
+    codings = parse_accept_encoding(header)
+    best, best_q = "identity", 0.0
+    for coding in available:
+        if coding == "br" and _brotli() is None:
+            continue
+        q = codings.get(coding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def iter_json_chunks(data, depth: int = STREAM_DEPTH):
+    """
+    Yield the JSON encoding of `data` piece by piece.
+
+    Top-level containers are walked so that only one leaf (a trade, a research
+    note) is ever encoded at a time; each leaf still goes through the C encoder.
+    Output matches json.dumps(data, default=str) for string-keyed data.
+    """
+    if depth > 0 and isinstance(data, dict):
+        yield "{"
+        first = True
+        for key, value in data.items():
+            if not first:
+                yield ", "
+            first = False
+            yield json.dumps(str(key)) + ": "
+            yield from iter_json_chunks(value, depth - 1)
+        yield "}"
+    elif depth > 0 and isinstance(data, (list, tuple)):
+        yield "["
+        first = True
+        for value in data:
+            if not first:
+                yield ", "
+            first = False
+            yield from iter_json_chunks(value, depth - 1)
+        yield "]"
+    else:
+        yield json.dumps(data, default=str)
+
+def iter_json_bytes(data, chunk_size: int = CHUNK_SIZE):
+    """UTF-8 encoded JSON in chunks of roughly chunk_size bytes."""
+    buffer = []
+    size = 0
+    for piece in iter_json_chunks(data):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+def compress_chunks(chunks, encoding: str) -> bytes:
+    """Compress a chunk iterator with gzip or br, holding only compressed output."""
+    if encoding == "br":
+        compressor = _brotli().Compressor(quality=BROTLI_QUALITY)
+        out = [compressor.process(chunk) for chunk in chunks]
+        out.append(compressor.finish())
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        out = [compressor.compress(chunk) for chunk in chunks]
+        out.append(compressor.flush())
+    return b"".join(out)
+
+def send_json(handler, data, status: int = 200, headers: dict = None):
+    """
+    Write `data` as a JSON response on a BaseHTTPRequestHandler.
+
+    The body is encoded incrementally. Compressed responses (negotiated from
+    Accept-Encoding) are sent with a Content-Length. Uncompressed responses
+    also get one when they are small; larger ones are streamed as they are
+    encoded.
+    """
+    encoding = negotiate_encoding(handler.headers.get("Accept-Encoding"))
+    chunks = iter_json_bytes(data)
+
+    # Encode as much as possible before the status line goes out, so an
+    # encoding error can still become a clean error response
+    body = None
+    buffered = []
+    if encoding != "identity":
+        body = compress_chunks(chunks, encoding)
+    else:
+        size = 0
+        for chunk in chunks:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > MAX_BUFFERED_IDENTITY:
+                break
+        else:
+            body = b"".join(buffered)
+
+    handler.send_response(status)
+    handler.send_header('Content-type', 'application/json')
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    handler.send_header('Vary', 'Accept-Encoding')
+    for name, value in (headers or {}).items():
+        handler.send_header(name, value)
+    if encoding != "identity":
+        handler.send_header('Content-Encoding', encoding)
+
+    if body is not None:
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        return
+
+    # Too large to buffer: stream it and let the connection close delimit the body
+    handler.send_header('Connection', 'close')
+    handler.end_headers()
+    for chunk in buffered:
+        handler.wfile.write(chunk)
+    for chunk in chunks:
+        handler.wfile.write(chunk)
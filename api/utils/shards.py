@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+from .config import MODELS
+from .portfolio import (
+    load_portfolio, get_portfolio_path, invalidate_portfolio_cache, update_portfolio_index
+)
+from .checkpoint import load_checkpoint, merge_checkpoint
+
+# A sharded cycle researches a subset of models per job (one GitHub Actions
+# matrix entry each) and stops once they have decided. Every shard writes its
+# results, checkpoint entries and the portfolio files it changed to its own
+# directory; a merge step folds all shards into DATA_DIR, then trades every
+# model's decisions in one batch, so orders are still netted across models
+# (see run_market_cycle.py), and the data is committed once.
+SHARD_RESULT_FILENAME = "result.json"
+SHARD_PORTFOLIO_DIR = "portfolios"
+
+def select_models(spec: str) -> list:
+    """
+    Model ids for a shard spec.
+
+    Args:
+        spec: "INDEX/COUNT" (models dealt round-robin over COUNT shards,
+            INDEX from 0) or a comma-separated list of model ids
+
+    Raises:
+        ValueError: On a malformed spec or an unknown model id
+    """
+    model_ids = [model["id"] for model in MODELS]
+    if "/" in spec and "," not in spec and spec.split("/")[0].isdigit():
+        index, count = (int(part) for part in spec.split("/"))
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Shard {spec}: index must be in 0..{count - 1}")
+        return model_ids[index::count]
+
+    selected = [model_id.strip() for model_id in spec.split(",") if model_id.strip()]
+    unknown = [model_id for model_id in selected if model_id not in model_ids]
+    if unknown:
+        raise ValueError(f"Unknown model ids: {', '.join(unknown)}")
+    return selected
+
+def write_shard_output(output_dir: str, shard: str, model_ids: list, results: list, error: str = None):
+    """
+    Write a shard's cycle results, checkpoint entries and portfolio files to
+    output_dir. Also called when the shard's cycle failed part way (error
+    set): the checkpoint then records how far each model got.
+    """
+    portfolio_dir = os.path.join(output_dir, SHARD_PORTFOLIO_DIR)
+    os.makedirs(portfolio_dir, exist_ok=True)
+
+    for model_id in model_ids:
+        path = get_portfolio_path(model_id)
+        if os.path.exists(path):
+            shutil.copy2(path, os.path.join(portfolio_dir, os.path.basename(path)))
+
+    checkpoint = load_checkpoint()
+    part = {
+        "date": checkpoint["date"],
+        "models": {m: checkpoint["models"][m] for m in model_ids if m in checkpoint["models"]},
+        "orders": checkpoint.get("orders", {})
+    }
+    with open(os.path.join(output_dir, SHARD_RESULT_FILENAME), "w") as f:
+        json.dump({
+            "shard": shard, "models": model_ids, "results": results, "checkpoint": part, "error": error
+        }, f, default=str)
+
+def merge_shard_outputs(shard_dirs: list) -> list:
+    """
+    Fold shard outputs into DATA_DIR: each shard's portfolio files and
+    checkpoint entries (only for the models it ran), then the index once for
+    everything. A shard whose cycle failed still contributes what it wrote
+    before failing, so its models that decided are traded with the rest.
+    Only a shard with no output at all (the job died before the cycle
+    started) is skipped.
+
+    Returns:
+        Cycle results of every merged shard, in MODELS order
+    """
+    checkpoint = load_checkpoint()
+    results = {}
+    merged = []
+    for shard_dir in shard_dirs:
+        try:
+            with open(os.path.join(shard_dir, SHARD_RESULT_FILENAME), "r") as f:
+                output = json.load(f)
+        except Exception as e:
+            print(f"Warning: Skipping shard output {shard_dir}: {e}")
+            continue
+
+        for model_id in output["models"]:
+            source = os.path.join(shard_dir, SHARD_PORTFOLIO_DIR, os.path.basename(get_portfolio_path(model_id)))
+            if os.path.exists(source):
+                shutil.copyfile(source, get_portfolio_path(model_id))
+                invalidate_portfolio_cache(model_id)
+                merged.append(model_id)
+        merge_checkpoint(checkpoint, output.get("checkpoint", {}))
+        for result in output.get("results", []):
+            results[result["model"]] = result
+        print(f"Merged shard {output.get('shard')}: {', '.join(output['models']) or 'no models'}")
+        if output.get("error"):
+            print(f"Warning: Shard {output.get('shard')} failed part way ({output['error']}); merged its partial state")
+
+    for model_id in merged:
+        update_portfolio_index(load_portfolio(model_id, readonly=True))
+    return [results[model["id"]] for model in MODELS if model["id"] in results]
@@ -0,0 +1,179 @@
+import hashlib
+import itertools
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from .config import get_account_credentials
+from .prices import load_cached_closes
+
+# Offline stand-in for utils/alpaca.py with the same order interface, selected
+# with BROKER=sim (see utils/broker.py). Accounts, orders and fills live in
+# process memory; prices come from the local daily-close cache (utils/prices.py).
+
+# Seconds between submission and fill; orders polled earlier are still "new"
+SIM_FILL_LATENCY_SECONDS = float(os.environ.get("SIM_FILL_LATENCY_SECONDS", "0.5"))
+# Adverse slippage against the quote, in basis points
+SIM_SLIPPAGE_BPS = float(os.environ.get("SIM_SLIPPAGE_BPS", "5"))
+# Share of orders that only partially fill before being canceled
+SIM_PARTIAL_FILL_RATE = float(os.environ.get("SIM_PARTIAL_FILL_RATE", "0"))
+SIM_STARTING_CASH = float(os.environ.get("SIM_STARTING_CASH", "100000"))
+SIM_SEED = int(os.environ.get("SIM_SEED", "0"))
+
+TERMINAL_ORDER_STATUSES = {"filled", "canceled", "rejected"}
+
+_accounts = {}
+_orders = {}
+_client_order_ids = {}
+_lock = threading.Lock()
+_order_ids = itertools.count(1)
+_rng = random.Random(SIM_SEED)
+
+def reset(seed: int = SIM_SEED):
+    """Forget all simulated accounts and orders."""
+    global _rng
+    with _lock:
+        _accounts.clear()
+        _orders.clear()
+        _client_order_ids.clear()
+        _rng = random.Random(seed)
+
+def _account(model_id: str = None) -> dict:
+    # One simulated account per credential pair, mirroring Alpaca routing
+    key = get_account_credentials(model_id)
+    account = _accounts.get(key)
+    if account is None:
+        account = _accounts[key] = {"cash": SIM_STARTING_CASH, "positions": {}}
+    return account
+
+def sim_price(ticker: str):
+    """
+    Last cached daily close for a ticker, or a stable synthetic price for
+    tickers with no cached history, so any symbol can be traded offline.
+
+    Returns:
+        (price, source)
+    """
+    record = load_cached_closes(ticker)
+    if record["closes"]:
+        return record["closes"][-1], "price_cache"
+    digest = int(hashlib.sha256(ticker.upper().encode("utf-8")).hexdigest()[:8], 16)
+    return round(10 + digest % 49000 / 100, 2), "synthetic"
+
+def get_latest_quotes(tickers: list, model_id: str = None) -> dict:
+    timestamp = datetime.now(timezone.utc).isoformat()
+    quotes = {}
+    for ticker in tickers:
+        price, _ = sim_price(ticker)
+        quotes[ticker] = {"price": price, "bid": price, "ask": price, "timestamp": timestamp, "source": "sim"}
+    return quotes
+
+def get_reference_quotes(tickers: list, model_id: str = None) -> dict:
+    return get_latest_quotes(tickers, model_id)
+
+def _public(order: dict) -> dict:
+    return {k: order[k] for k in ("id", "status", "filled_qty", "filled_avg_price", "qty", "price", "symbol", "side")}
+
+def _settle(order: dict):
+    """Fill an order once its latency has elapsed. Caller holds _lock."""
+    if order["status"] in TERMINAL_ORDER_STATUSES or time.monotonic() < order["fills_at"]:
+        return
+    slip = SIM_SLIPPAGE_BPS / 10000 * (1 if order["side"] == "BUY" else -1)
+    fill_price = order["price"] * (1 + slip)
+    qty = order["qty"]
+    status = "filled"
+    if _rng.random() < SIM_PARTIAL_FILL_RATE:
+        qty *= _rng.uniform(0.3, 0.9)
+        status = "canceled"
+
+    account = _accounts[order["account"]]
+    held = account["positions"].get(order["symbol"], 0.0)
+    if order["side"] == "BUY":
+        account["positions"][order["symbol"]] = held + qty
+        account["cash"] -= qty * fill_price
+    else:
+        account["positions"][order["symbol"]] = held - qty
+        account["cash"] += qty * fill_price
+    if abs(account["positions"][order["symbol"]]) < 1e-9:
+        del account["positions"][order["symbol"]]
+
+    order.update(status=status, filled_qty=qty, filled_avg_price=fill_price)
+
+def execute_trade(ticker: str, side: str, amount_usd: float = 0, model_id: str = None,
+                  price: float = None, qty=None, client_order_id: str = None) -> dict:
+    """Simulated counterpart of alpaca.execute_trade; same arguments and result shape."""
+    quote, _ = sim_price(ticker)
+    with _lock:
+        if client_order_id in _client_order_ids:
+            order = _orders[_client_order_ids[client_order_id]]
+            _settle(order)
+            return _public(order)
+        account = _account(model_id)
+        if qty == "ALL":
+            qty = account["positions"].get(ticker, 0.0)
+            side = "SELL"
+        elif qty is None:
+            if not price:
+                price = quote
+            qty = amount_usd / price
+        if qty <= 0:
+            return {"error": "Order quantity must be positive", "symbol": ticker, "side": side}
+
+        order = {
+            "id": f"sim-{next(_order_ids)}",
+            "status": "new",
+            "filled_qty": 0.0,
+            "filled_avg_price": None,
+            "qty": qty,
+            "price": price if price else quote,
+            "symbol": ticker,
+            "side": side,
+            "account": get_account_credentials(model_id),
+            "fills_at": time.monotonic() + SIM_FILL_LATENCY_SECONDS
+        }
+        _orders[order["id"]] = order
+        if client_order_id:
+            _client_order_ids[client_order_id] = order["id"]
+        _settle(order)
+        return _public(order)
+
+def get_order(order_id: str, model_id: str = None) -> dict:
+    with _lock:
+        order = _orders.get(order_id)
+        if order is None:
+            return {"error": "Order not found", "id": order_id}
+        _settle(order)
+        return _public(order)
+
+def cancel_order(order_id: str, model_id: str = None) -> dict:
+    with _lock:
+        order = _orders.get(order_id)
+        if order is None:
+            return {"error": "Order not found", "id": order_id}
+        _settle(order)
+        if order["status"] not in TERMINAL_ORDER_STATUSES:
+            order["status"] = "canceled"
+        return {}
+
+def get_alpaca_portfolio(model_id: str = None) -> dict:
+    """Simulated account state, shaped like alpaca.get_alpaca_portfolio."""
+    with _lock:
+        for order in _orders.values():
+            _settle(order)
+        account = _account(model_id)
+        positions = []
+        for ticker, shares in account["positions"].items():
+            price, _ = sim_price(ticker)
+            positions.append({
+                "ticker": ticker,
+                "shares": shares,
+                "market_value": shares * price,
+                "unrealized_pnl": 0.0,
+                "unrealized_pnl_pct": 0.0
+            })
+        return {
+            "cash": account["cash"],
+            "portfolio_value": account["cash"] + sum(p["market_value"] for p in positions),
+            "positions": positions
+        }
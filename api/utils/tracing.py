@@ -0,0 +1,108 @@
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Timing spans for the daily cycle in Chrome's Trace Event Format; open the
+# written file in chrome://tracing or https://ui.perfetto.dev. One file per run.
+TRACE_DIR = os.environ.get("CYCLE_TRACE_DIR") or os.path.join(tempfile.gettempdir(), "value_arena_traces")
+
+# Spans beyond this are dropped so a runaway loop cannot exhaust memory
+MAX_SPANS = 100000
+
+_spans = []
+_thread_names = {}
+_lock = threading.Lock()
+_origin = time.perf_counter()
+
+def start_trace(origin: float = None):
+    """
+    Discard recorded spans and restart the trace clock. A worker process
+    passes the parent's trace_origin() so its spans line up with the parent's
+    (perf_counter is a system-wide monotonic clock).
+    """
+    global _origin
+    with _lock:
+        _spans.clear()
+        _thread_names.clear()
+        _origin = time.perf_counter() if origin is None else origin
+
+def trace_origin() -> float:
+    return _origin
+
+@contextlib.contextmanager
+def span(name: str, category: str = "cycle", **args):
+    """
+    Record the enclosed block as a complete event. Yields the span's args so
+    the block can attach counters once known (bytes, token counts).
+
+    Usage:
+        with span("parse", model=model_id) as info:
+            parsed = parse(text)
+            info["trades"] = len(parsed["trades"])
+    """
+    started = time.perf_counter()
+    try:
+        yield args
+    finally:
+        ended = time.perf_counter()
+        thread = threading.current_thread()
+        with _lock:
+            if len(_spans) < MAX_SPANS:
+                _spans.append({
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (started - _origin) * 1e6,
+                    "dur": (ended - started) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": thread.ident,
+                    "args": args
+                })
+                _thread_names[(os.getpid(), thread.ident)] = thread.name
+
+def collect_spans() -> list:
+    """Spans recorded so far, with their thread names, for handing to another process."""
+    with _lock:
+        return [dict(event, thread_name=_thread_names.get((event["pid"], event["tid"]))) for event in _spans]
+
+def add_spans(spans: list):
+    """Merge spans recorded by a worker process (see collect_spans)."""
+    with _lock:
+        for event in spans:
+            event = dict(event)
+            name = event.pop("thread_name", None)
+            if name:
+                _thread_names[(event["pid"], event["tid"])] = name
+            if len(_spans) < MAX_SPANS:
+                _spans.append(event)
+
+def write_trace(path: str = None) -> str:
+    """
+    Write every span recorded since start_trace() as a Chrome trace file.
+
+    Returns:
+        The path written, or None if writing failed
+    """
+    if path is None:
+        path = os.path.join(TRACE_DIR, f"cycle-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with _lock:
+        events = list(_spans)
+        names = dict(_thread_names)
+
+    metadata = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+        for (pid, tid), name in names.items()
+    ]
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f, default=str)
+    except Exception as e:
+        print(f"Warning: Could not write trace {path}: {e}")
+        return None
+    print(f"Trace written to {path} ({len(events)} spans)")
+    return path
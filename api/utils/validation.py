@@ -0,0 +1,77 @@
+import re
+from .config import MAX_POSITIONS
+
+# US equity symbols: 1-5 letters, optionally a share-class suffix (BRK.B, BF-B)
+SYMBOL_PATTERN = re.compile(r"^[A-Z]{1,5}([.\-][A-Z]{1,2})?$")
+
+def build_book(portfolio: dict, cash: float) -> dict:
+    """In-memory view of a model's tracked holdings for pre-trade checks."""
+    return {
+        "cash": cash,
+        "positions": {pos["ticker"]: pos.get("shares", 0) for pos in portfolio.get("positions", [])}
+    }
+
+def _check(intent: dict, book: dict, price: float):
+    """Reason the intent must not be sent, or None. Applies it to the book if it passes."""
+    ticker = intent["ticker"]
+    if not SYMBOL_PATTERN.match(ticker):
+        return f"invalid symbol {ticker!r}"
+    if not price:
+        return f"no quote for {ticker}"
+
+    held = book["positions"].get(ticker, 0)
+    if intent["side"] == "SELL":
+        if held <= 0:
+            return f"no position in {ticker}"
+        shares = intent["qty"] if intent["qty"] is not None else intent["amount_usd"] / price
+        if shares <= 0:
+            return "sell amount must be positive"
+        if shares > held * 1.0001:  # Tolerate rounding between quote and tracked price
+            return f"sell of {shares:.4f} shares exceeds position of {held:.4f}"
+        book["positions"][ticker] = max(held - shares, 0)
+        if not book["positions"][ticker]:
+            del book["positions"][ticker]
+        book["cash"] += shares * price
+        return None
+
+    amount = intent["amount_usd"]
+    if amount <= 0:
+        return "buy amount must be positive"
+    if amount > book["cash"] + 0.01:
+        return f"insufficient buying power (${amount:,.2f} requested, ${book['cash']:,.2f} available)"
+    if held <= 0 and len(book["positions"]) >= MAX_POSITIONS:
+        return f"would exceed {MAX_POSITIONS} positions"
+    book["positions"][ticker] = held + amount / price
+    book["cash"] -= amount
+    return None
+
+def validate_intents(intents: list, books: dict, prices: dict) -> tuple:
+    """
+    Check a batch of order intents against each model's book in one pass:
+    symbol validity, position existence, buying power and the position
+    limit. Each model's sells are applied before its buys, matching how the
+    batch executes, so an exit frees cash and a slot for a new position.
+
+    Args:
+        intents: Order intents from build_order_intents
+        books: {model_id: book} from build_book; models without a book are not checked
+        prices: Reference price per ticker
+
+    Returns:
+        (accepted intents, [(intent, reason) for each rejected intent])
+    """
+    accepted = []
+    rejected = []
+    ordered = sorted(intents, key=lambda intent: intent["side"] != "SELL")
+    for intent in ordered:
+        book = books.get(intent["model_id"])
+        if book is None:
+            accepted.append(intent)
+            continue
+        reason = _check(intent, book, prices.get(intent["ticker"]))
+        if reason:
+            print(f"Rejected {intent['model_id']} {intent['side']} {intent['ticker']}: {reason}")
+            rejected.append((intent, reason))
+        else:
+            accepted.append(intent)
+    return accepted, rejected
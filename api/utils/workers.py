@@ -0,0 +1,130 @@
+import multiprocessing
+import multiprocessing.connection
+import threading
+import time
+import traceback
+
+# How often running workers are checked against their deadline and RSS limit
+POLL_SECONDS = 0.25
+# Grace period for a worker to exit after sending its result
+EXIT_GRACE_SECONDS = 5
+
+def _rss_mb(pid: int):
+    """Resident set size of a process in MB, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+# The pipe to the parent, inside a worker process
+_conn = None
+_send_lock = threading.Lock()
+
+def report(message):
+    """
+    From inside a worker: send message to the parent right away, so it
+    arrives even if the worker is killed later (see run_workers on_report).
+    Does nothing outside a worker.
+    """
+    if _conn is not None:
+        with _send_lock:
+            _conn.send({"report": message})
+
+def _child(conn, target, args):
+    global _conn
+    _conn = conn
+    try:
+        outcome = {"ok": True, "value": target(*args)}
+    except BaseException as e:
+        outcome = {"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+    try:
+        with _send_lock:
+            conn.send(outcome)
+    finally:
+        conn.close()
+
+def _receive(key, process, receiver, on_report):
+    """Pass on the worker's pending reports; its outcome if it has sent it, else None."""
+    while receiver.poll():
+        try:
+            message = receiver.recv()
+        except EOFError:
+            process.join(EXIT_GRACE_SECONDS)
+            return {"ok": False, "error": f"worker exited with code {process.exitcode}"}
+        if "report" not in message:
+            return message
+        if on_report:
+            on_report(key, message["report"])
+    return None
+
+def _stop(process):
+    process.join(EXIT_GRACE_SECONDS)
+    if process.is_alive():
+        process.terminate()
+        process.join(EXIT_GRACE_SECONDS)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+def run_workers(jobs: list, max_workers: int, deadline_seconds: float, rss_limit_mb: float, on_report=None):
+    """
+    Run each job's target(*args) in its own process, at most max_workers at a
+    time. A worker that passes its wall-clock deadline or RSS limit is killed
+    and reported as failed; the others keep running.
+
+    Args:
+        jobs: (key, target, args) tuples. target must be importable at module
+            level (workers are spawned). args may be a callable returning the
+            args tuple, evaluated when the worker starts.
+        on_report: Optional callback on_report(key, message) for each
+            report(message) a worker sends, as it arrives (also from workers
+            that are killed afterwards)
+
+    Yields:
+        (key, outcome) as workers finish, where outcome is {"ok": True, "value"}
+        or {"ok": False, "error"}
+    """
+    ctx = multiprocessing.get_context("spawn")
+    pending = list(jobs)
+    running = {}
+
+    while pending or running:
+        while pending and len(running) < max_workers:
+            key, target, args = pending.pop(0)
+            receiver, sender = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_child, args=(sender, target, args() if callable(args) else args),
+                name=f"worker-{key}", daemon=True
+            )
+            process.start()
+            sender.close()  # Only the child writes; EOF on our end means it died
+            running[key] = (process, receiver, time.monotonic())
+
+        multiprocessing.connection.wait([receiver for _, receiver, _ in running.values()], timeout=POLL_SECONDS)
+
+        for key in list(running):
+            process, receiver, started = running[key]
+            outcome = _receive(key, process, receiver, on_report)
+            if outcome is None:
+                if not process.is_alive():
+                    process.join()
+                    outcome = {"ok": False, "error": f"worker exited with code {process.exitcode}"}
+                elif time.monotonic() - started > deadline_seconds:
+                    outcome = {"ok": False, "error": f"timed out after {deadline_seconds:.0f}s"}
+                else:
+                    rss = _rss_mb(process.pid)
+                    if rss is not None and rss > rss_limit_mb:
+                        outcome = {"ok": False, "error": f"exceeded memory limit ({rss:.0f} MB > {rss_limit_mb:.0f} MB)"}
+
+            if outcome is None:
+                continue
+            if not outcome["ok"]:
+                process.terminate()
+            _stop(process)
+            receiver.close()
+            del running[key]
+            yield key, outcome
@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+# Add repo root to path
+sys.path.append(os.getcwd())
+
+from api.utils.backfill import backfill_nav_history
+from api.utils.leaderboard import write_leaderboard_snapshot
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    refresh = "--cached" not in sys.argv  # --cached: use only the local price cache
+    model_ids = [arg for arg in sys.argv[1:] if not arg.startswith("--")] or None
+
+    print("Backfilling NAV history from trade history and cached prices...")
+    start = time.perf_counter()
+    rebuilt = backfill_nav_history(model_ids=model_ids, write=not dry_run, refresh=refresh)
+    elapsed = time.perf_counter() - start
+    if not dry_run:
+        write_leaderboard_snapshot()
+
+    for model_id, history in rebuilt.items():
+        last = history[-1] if history else {}
+        print(f"  {model_id}: {len(history)} points, latest {last.get('date')} NAV ${last.get('nav', 0):,.2f}")
+
+    print(f"\n--- Backfill {'previewed' if dry_run else 'complete'} in {elapsed:.2f}s ---")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Peak memory, bytes on the wire and time for encoding the get_all_portfolios
+response: the old json.dumps(...).encode() path vs the streaming encoder with
+each negotiated content coding.
+
+Run: python -m benchmarks.bench_response_encoding
+"""
+
+import json
+import time
+import tracemalloc
+
+from api.utils.responses import iter_json_bytes, compress_chunks, _brotli
+from benchmarks.synthetic import make_portfolios
+
+SIZES = [
+    ("small", dict(n_trades=100, n_notes=50)),
+    ("medium", dict(n_trades=2000, n_notes=500)),
+    ("large", dict(n_trades=10000, n_notes=2000)),
+]
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+def baseline(data):
+    return len(json.dumps(data, default=str).encode("utf-8"))
+
+def streamed_identity(data):
+    return sum(len(chunk) for chunk in iter_json_bytes(data))
+
+def streamed(encoding):
+    return lambda data: len(compress_chunks(iter_json_bytes(data), encoding))
+
+def main():
+    variants = [("baseline", baseline), ("stream", streamed_identity), ("stream+gzip", streamed("gzip"))]
+    if _brotli() is not None:
+        variants.append(("stream+br", streamed("br")))
+
+    print(f"{'payload':<8} {'variant':<12} {'bytes':>12} {'peak mem':>12} {'time':>9}")
+    for label, kwargs in SIZES:
+        data = make_portfolios(**kwargs)
+        base_size = base_peak = None
+        for name, fn in variants:
+            size, peak, elapsed = measure(lambda: fn(data))
+            if base_size is None:
+                base_size, base_peak = size, peak
+                ratio = ""
+            else:
+                ratio = f"  ({size / base_size:.1%} bytes, {peak / base_peak:.1%} mem)"
+            print(f"{label:<8} {name:<12} {size:>12,} {peak:>12,} {elapsed:>8.3f}s{ratio}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+pytest-benchmark suite for the cycle, storage and API hot paths. Runs offline
+against synthetic portfolios in a throwaway data directory with the
+simulated broker.
+
+Run:  python -m pytest benchmarks --benchmark-only
+Save: ... --benchmark-storage=benchmarks/baselines --benchmark-save=baseline
+Compare against the saved baseline (fails on a >30% slower median):
+      ... --benchmark-storage=benchmarks/baselines --benchmark-compare --benchmark-compare-fail=median:30%
+
+The test_*.py files here are only collected when the benchmarks are asked for
+(the directory is named on the command line, or --benchmark-only), so a plain
+`pytest` from the repo root does not run them.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_data_root = None
+
+def _benchmarking(config) -> bool:
+    try:
+        import pytest_benchmark  # noqa: F401
+    except ImportError:
+        return False
+    if config.getoption("benchmark_only", default=False):
+        return True
+    for arg in config.args:
+        path = os.path.abspath(arg.split("::")[0])
+        if path == BENCH_DIR or path.startswith(BENCH_DIR + os.sep):
+            return True
+    return False
+
+def pytest_ignore_collect(collection_path, config):
+    if collection_path.name.startswith("test_") and not _benchmarking(config):
+        return True
+    return None
+
+def pytest_configure(config):
+    global _data_root
+    if not _benchmarking(config) or _data_root:
+        return
+    # Before anything under api/ is imported: portfolio, price cache and trace
+    # directories all resolve under tempfile.gettempdir()
+    _data_root = tempfile.mkdtemp(prefix="value_arena_bench_")
+    tempfile.tempdir = _data_root
+    os.environ.pop("GITHUB_ACTIONS", None)  # Would point DATA_DIR at data/portfolios
+    os.environ.pop("CYCLE_EVENT_LOG", None)
+    os.environ["BROKER"] = "sim"
+    os.environ["SIM_FILL_LATENCY_SECONDS"] = "0"
+
+def pytest_unconfigure(config):
+    if _data_root:
+        tempfile.tempdir = None
+        shutil.rmtree(_data_root, ignore_errors=True)
+
+@pytest.fixture(scope="session", autouse=True)
+def bench_data_dir():
+    from api.utils import portfolio
+    if not _data_root or not portfolio.DATA_DIR.startswith(_data_root):
+        pytest.exit(f"Refusing to benchmark against {portfolio.DATA_DIR}; api/ was imported before the benchmark setup")
+    return portfolio.DATA_DIR
+
+@pytest.fixture(scope="session")
+def synthetic_portfolios():
+    """
+    make_portfolios(...) for the first n_models of MODELS, generated once per
+    session (the largest take seconds). A 100k-trade portfolio is ~100 MB of
+    JSON, so all-model benchmarks stop at ALL_MODELS_SIZES (synthetic.py).
+    """
+    from benchmarks.synthetic import make_portfolios
+    from api.utils.config import MODELS
+    cache = {}
+
+    def get(size: tuple, n_models: int = 1) -> list:
+        if (size, n_models) not in cache:
+            n_trades, n_notes = size
+            documents = make_portfolios(n_models, n_trades=n_trades, n_notes=n_notes)
+            for document, model in zip(documents, MODELS):
+                document["model_id"] = model["id"]
+            cache.clear()
+            cache[(size, n_models)] = documents
+        return cache[(size, n_models)]
+    return get
+
+@pytest.fixture
+def write_portfolios(synthetic_portfolios):
+    """Save synthetic portfolios of the given size to the data dir."""
+    from api.utils.portfolio import save_portfolio
+
+    def write(size: tuple, n_models: int = 1) -> list:
+        documents = synthetic_portfolios(size, n_models)
+        for document in documents:
+            save_portfolio(document)
+        return documents
+    return write
@@ -0,0 +1,120 @@
+"""
+Synthetic portfolio documents shaped like data/portfolios/*.json, for offline
+benchmarks.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+TICKERS = [
+    "PFE", "T", "BRK-B", "JPM", "CVX", "PG", "JNJ", "HD", "BAC", "XOM",
+    "INTC", "VZ", "WBA", "MMM", "KO", "PEP", "MCD", "WMT", "TGT", "STLA"
+]
+
+# Research notes in the real data run to several KB of prose
+NOTE_PARAGRAPH = (
+    "Reviewed the current book against updated fundamentals. Valuation remains "
+    "below our estimate of intrinsic value with a reasonable margin of safety; "
+    "balance sheet leverage is manageable and free cash flow covers the dividend. "
+)
+
+# (trades, research notes) per portfolio for the pytest-benchmark suite
+SIZES = [(100, 10), (1000, 100), (10000, 1000), (100000, 10000)]
+SIZE_IDS = [f"{trades}t-{notes}n" for trades, notes in SIZES]
+# Benchmarks that hold every model's portfolio at once stop short of the largest
+ALL_MODELS_SIZES = SIZES[:3]
+ALL_MODELS_SIZE_IDS = SIZE_IDS[:3]
+
+def make_portfolio(model_id: str, n_trades: int = 100, n_notes: int = 10, n_days: int = 250, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 2)
+
+    trades = []
+    for i in range(n_trades):
+        ticker = rng.choice(TICKERS)
+        price = rng.uniform(20, 400)
+        amount = rng.randint(200, 3000)
+        trades.append({
+            "action": rng.choice(["BUY", "BUY", "SELL"]),
+            "ticker": ticker,
+            "amount_usd": amount,
+            "thesis": NOTE_PARAGRAPH[:rng.randint(80, len(NOTE_PARAGRAPH))],
+            "date": (start + timedelta(minutes=37 * i)).isoformat(),
+            "result": {
+                "id": f"order-{seed}-{i}",
+                "status": "filled",
+                "filled_qty": amount / price,
+                "filled_avg_price": price,
+                "qty": amount / price,
+                "price": price,
+                "symbol": ticker,
+                "side": "BUY"
+            }
+        })
+
+    notes = [
+        {
+            "date": (start + timedelta(days=i)).strftime("%Y-%m-%d"),
+            "notes": NOTE_PARAGRAPH * rng.randint(5, 40)
+        }
+        for i in range(n_notes)
+    ]
+
+    nav = 10000.0
+    nav_history = []
+    for i in range(n_days):
+        nav *= 1 + rng.gauss(0.0003, 0.01)
+        nav_history.append({"date": (start + timedelta(days=i)).strftime("%Y-%m-%d"), "nav": nav})
+
+    positions = [
+        {
+            "ticker": ticker,
+            "shares": rng.uniform(5, 150),
+            "entry_price": rng.uniform(20, 400),
+            "market_value": rng.uniform(500, 3500),
+            "unrealized_pnl": 0,
+            "unrealized_pnl_pct": 0,
+            "thesis": NOTE_PARAGRAPH
+        }
+        for ticker in rng.sample(TICKERS, 8)
+    ]
+
+    return {
+        "model_id": model_id,
+        "starting_capital": 10000,
+        "positions": positions,
+        "trade_history": trades,
+        "research_logs": notes,
+        "nav_history": nav_history
+    }
+
+def make_portfolios(n_models: int = 7, **kwargs) -> list:
+    return [make_portfolio(f"bench/model-{i}", seed=i, **kwargs) for i in range(n_models)]
+
+def make_model_response(n_trades: int = 5, n_paragraphs: int = 20, seed: int = 0, fenced: bool = True) -> str:
+    """
+    A final model message in the format SYSTEM_PROMPT asks for: prose, then the
+    decision JSON (in a ```json fence, or bare when fenced is False).
+    """
+    rng = random.Random(seed)
+    trades = []
+    for _ in range(n_trades):
+        if rng.random() < 0.7:
+            trades.append({
+                "action": "BUY",
+                "ticker": rng.choice(TICKERS),
+                "amount_usd": rng.randint(200, 1500),
+                "thesis": NOTE_PARAGRAPH
+            })
+        else:
+            trades.append({"action": "SELL", "ticker": rng.choice(TICKERS), "shares": "ALL", "reason": NOTE_PARAGRAPH})
+    decision = json.dumps({
+        "thinking": NOTE_PARAGRAPH * n_paragraphs,
+        "research_notes": NOTE_PARAGRAPH * n_paragraphs,
+        "trades": trades
+    }, indent=4)
+    preamble = NOTE_PARAGRAPH * n_paragraphs
+    if fenced:
+        return f"{preamble}\n\n```json\n{decision}\n```\n"
+    return f"{preamble}\n\n{decision}\n"
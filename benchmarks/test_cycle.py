@@ -0,0 +1,73 @@
+"""
+Daily cycle hot paths: cash and position bookkeeping, decision parsing, and a
+full run_daily_review with the LLM stubbed out and orders sent to the
+simulated broker.
+"""
+
+import os
+
+import pytest
+
+from api import run_daily
+from api.utils import checkpoint, sim_broker
+from api.utils.config import MODELS
+from api.utils.portfolio import calculate_cash_balance, update_position_after_trade
+from benchmarks.synthetic import (
+    SIZES, SIZE_IDS, ALL_MODELS_SIZES, ALL_MODELS_SIZE_IDS, make_model_response
+)
+
+@pytest.mark.parametrize("size", SIZES, ids=SIZE_IDS)
+def test_calculate_cash_balance(benchmark, write_portfolios, size):
+    model_id = write_portfolios(size)[0]["model_id"]
+    calculate_cash_balance(model_id)  # Parse outside the timed rounds; the cycle hits the cache
+
+    benchmark(calculate_cash_balance, model_id)
+
+@pytest.mark.parametrize("size", SIZES, ids=SIZE_IDS)
+def test_update_position_after_trade(benchmark, synthetic_portfolios, size):
+    """Replay the trade history into an empty book."""
+    # Synthetic histories sell tickers at random; keep only sells of something
+    # held so the timing is bookkeeping rather than warning prints
+    trades = []
+    held = set()
+    for trade in synthetic_portfolios(size)[0]["trade_history"]:
+        if trade["action"] == "BUY":
+            held.add(trade["ticker"])
+        elif trade["ticker"] not in held:
+            continue
+        trades.append(trade)
+
+    def replay():
+        portfolio = {"positions": []}
+        for trade in trades:
+            update_position_after_trade(portfolio, trade, trade["result"], trade["result"]["price"])
+        return portfolio
+
+    benchmark(replay)
+
+# (trades in the decision, paragraphs of prose around it)
+RESPONSES = [(5, 10), (50, 100), (500, 1000)]
+
+@pytest.mark.parametrize("fenced", [True, False], ids=["fenced", "bare"])
+@pytest.mark.parametrize("n_trades,n_paragraphs", RESPONSES, ids=[f"{t}t-{p}p" for t, p in RESPONSES])
+def test_parse_model_response(benchmark, n_trades, n_paragraphs, fenced):
+    response = make_model_response(n_trades, n_paragraphs, fenced=fenced)
+
+    parsed = benchmark(run_daily.parse_model_response, response)
+    assert len(parsed["trades"]) == n_trades
+
+@pytest.mark.parametrize("size", ALL_MODELS_SIZES, ids=ALL_MODELS_SIZE_IDS)
+def test_run_daily_review(benchmark, monkeypatch, write_portfolios, size):
+    """One full cycle for every model from freshly written portfolios."""
+    responses = {model["id"]: make_model_response(5, 20, seed=i) for i, model in enumerate(MODELS)}
+    monkeypatch.setattr(run_daily, "call_openrouter", lambda model, **kwargs: responses[model])
+
+    def setup():
+        write_portfolios(size, n_models=len(MODELS))
+        sim_broker.reset()
+        path = os.path.join(checkpoint.DATA_DIR, checkpoint.CHECKPOINT_FILENAME)
+        if os.path.exists(path):
+            os.remove(path)
+
+    results = benchmark.pedantic(run_daily.run_daily_review, setup=setup, rounds=3)
+    assert all(result["status"] == "success" for result in results)
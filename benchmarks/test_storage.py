@@ -0,0 +1,49 @@
+"""
+Portfolio storage and the /api/portfolios read path.
+"""
+
+import pytest
+
+from api.utils.config import MODELS
+from api.utils.portfolio import (
+    load_portfolio, save_portfolio, get_all_portfolios, invalidate_portfolio_cache
+)
+from api.utils.responses import iter_json_bytes
+from benchmarks.synthetic import SIZES, SIZE_IDS, ALL_MODELS_SIZES, ALL_MODELS_SIZE_IDS
+
+@pytest.mark.parametrize("size", SIZES, ids=SIZE_IDS)
+def test_load_portfolio(benchmark, write_portfolios, size):
+    """Parse from disk (cache dropped each round) and return a mutable copy, as the cycle does."""
+    model_id = write_portfolios(size)[0]["model_id"]
+
+    def load():
+        invalidate_portfolio_cache(model_id)
+        return load_portfolio(model_id)
+
+    portfolio = benchmark(load)
+    assert len(portfolio["trade_history"]) == size[0]
+
+@pytest.mark.parametrize("size", SIZES, ids=SIZE_IDS)
+def test_load_portfolio_cached(benchmark, write_portfolios, size):
+    """Warm read path: unchanged file, shared read-only document."""
+    model_id = write_portfolios(size)[0]["model_id"]
+    load_portfolio(model_id, readonly=True)
+
+    portfolio = benchmark(load_portfolio, model_id, readonly=True)
+    assert len(portfolio["trade_history"]) == size[0]
+
+@pytest.mark.parametrize("size", SIZES, ids=SIZE_IDS)
+def test_save_portfolio(benchmark, synthetic_portfolios, size):
+    document = synthetic_portfolios(size)[0]
+    benchmark(save_portfolio, document)
+
+@pytest.mark.parametrize("size", ALL_MODELS_SIZES, ids=ALL_MODELS_SIZE_IDS)
+def test_get_all_portfolios_response(benchmark, write_portfolios, size):
+    """Every model's document, encoded as send_json streams it (warm cache)."""
+    write_portfolios(size, n_models=len(MODELS))
+    get_all_portfolios()
+
+    def respond():
+        return sum(len(chunk) for chunk in iter_json_bytes(get_all_portfolios()))
+
+    assert benchmark(respond) > 0
@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+import time
+
+# Add repo root to path
+sys.path.append(os.getcwd())
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Reprice held positions and today's NAV point from live quotes. No research, no trades."
+    )
+    parser.add_argument("model_ids", nargs="*", help="Models to mark. Default: all models")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    from api.utils.marking import mark_to_market
+
+    print("Marking portfolios to market...")
+    start = time.perf_counter()
+    results = mark_to_market(model_ids=args.model_ids or None)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        status = "updated" if result["updated"] else "unchanged"
+        unpriced = f", unpriced: {', '.join(result['unpriced'])}" if result["unpriced"] else ""
+        print(f"  {result['model']}: NAV ${result['nav']:,.2f} ({result['positions']} positions, {status}{unpriced})")
+
+    print(f"\n--- Mark to market complete in {elapsed:.2f}s ---")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
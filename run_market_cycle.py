@@ -1,25 +1,90 @@
+import argparse
 import asyncio
 import os
+import signal
 import sys
 
 # Add repo root to path
 sys.path.append(os.getcwd())
 
-from api.run_daily import run_daily_review
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the daily market cycle, whole or as one research shard.")
+    parser.add_argument(
+        "--shard",
+        help='Models to run: "INDEX/COUNT" (e.g. 0/7) or comma-separated model ids. Default: all models'
+    )
+    parser.add_argument(
+        "--shard-output", default="shard_output",
+        help="With --shard: directory for this shard's results and portfolio files (default: shard_output)"
+    )
+    parser.add_argument(
+        "--merge", nargs="+", metavar="SHARD_DIR",
+        help="Merge shard output directories into data/portfolios and trade their decisions in one batch"
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
+    if args.merge:
+        from api.utils.shards import merge_shard_outputs
+        from api.run_daily import run_daily_review
+        print(f"Merging {len(args.merge)} shard outputs...")
+        shard_results = merge_shard_outputs(args.merge)
+        # Shards only research; every model's decided trades are netted and
+        # sent here in one batch. No model is asked again
+        print("Trading merged decisions...")
+        failed = {result["model"]: result for result in shard_results if result.get("status") == "error"}
+        results = [failed.get(result["model"], result) for result in run_daily_review(research=False)]
+        print("\n--- Merge Complete ---")
+        print(results)
+        sys.exit(0)
+
+    from api.run_daily import run_daily_review
+    from api.utils import llm
+    from api.utils.config import MODELS, MAX_DAILY_SPEND
+
+    model_ids = None
+    if args.shard:
+        from api.utils.shards import select_models
+        model_ids = select_models(args.shard)
+        # Each shard is its own process; give it its models' share of the daily
+        # LLM budget (the environment variable reaches spawned research workers)
+        llm.MAX_DAILY_SPEND = MAX_DAILY_SPEND * len(model_ids) / len(MODELS)
+        os.environ["MAX_DAILY_SPEND"] = str(llm.MAX_DAILY_SPEND)
+        print(f"Shard {args.shard}: {', '.join(model_ids) or 'no models'}")
+
     print("Starting Daily Market Cycle...")
     print(f"Time: {os.environ.get('github_event_time', 'Now')}")
-    
-    # Run the synchronous loop
-    results = run_daily_review()
-    
+
+    if args.shard:
+        # A cancelled or timed-out job gets SIGTERM; exit through the finally
+        # below so the shard output is still written
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    results = []
+    error = None
+    try:
+        # Run the synchronous loop; a shard stops once its models have
+        # decided and the merge job trades them all together
+        results = run_daily_review(model_ids=model_ids, trade=not args.shard) if model_ids != [] else []
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if args.shard:
+            # Always hand the merge job this shard's checkpoint entries and
+            # portfolio files, so models that decided are traded and not
+            # researched again by a rerun
+            from api.utils.shards import write_shard_output
+            write_shard_output(args.shard_output, args.shard, model_ids, results, error=error)
+            print(f"Shard output written to {args.shard_output}" + (f" after failure ({error})" if error else ""))
+
     print("\n--- Cycle Complete ---")
     print(results)
-    
+
     # Exit with error if any model failed completely (optional, keeping 0 to allow commit of partials)
     sys.exit(0)
 
 if __name__ == "__main__":
     main()
-
@@ -1,16 +1,25 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import json
+import queue
 import sys
 import os
 
 # Add current directory to path
 sys.path.append(os.getcwd())
 
-from api.utils.portfolio import get_all_portfolios, load_portfolio
+from api.utils.portfolio import (
+    get_all_portfolios, load_portfolio, get_portfolio_summaries, get_portfolio_page, DEFAULT_PAGE_LIMIT
+)
+from api.utils.analytics import get_performance_analytics
+from api.utils.responses import send_json
 from api.run_daily import run_daily_review
+from api.utils.config import MODELS
+from api.utils.jobs import start_job, get_job, wait_job
+from api.utils.events import subscribe, unsubscribe, format_sse
 
 PORT = 5328
+SSE_KEEPALIVE_SECONDS = 15
 
 class DevHandler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -20,17 +29,77 @@ class DevHandler(BaseHTTPRequestHandler):
         
         response_data = {}
 
+        if path == "/api/run_events":
+            self.stream_events(query_params)
+            return
+
         try:
             if path == "/api/portfolios" or path == "/api/portfolio":
-                if "id" in query_params:
+                view = query_params.get("view", [None])[0]
+                fields = None
+                if "fields" in query_params:
+                    fields = [f for f in query_params["fields"][0].split(",") if f]
+                    view = "summary"
+                
+                if view == "analytics":
+                    response_data = get_performance_analytics()
+                elif view == "summary":
+                    if "id" in query_params:
+                        response_data = get_portfolio_summaries(fields, model_ids=[query_params["id"][0]])[0]
+                    else:
+                        response_data = get_portfolio_summaries(fields)
+                elif "section" in query_params and "id" in query_params:
+                    # Cursor-paginated trade_history / research_logs
+                    try:
+                        response_data = get_portfolio_page(
+                            query_params["id"][0],
+                            query_params["section"][0],
+                            limit=query_params.get("limit", [DEFAULT_PAGE_LIMIT])[0],
+                            before=query_params.get("before", [None])[0]
+                        )
+                    except ValueError as e:
+                        self.send_error_json(400, {"error": str(e)})
+                        return
+                elif "id" in query_params:
                     model_id = query_params["id"][0]
-                    response_data = load_portfolio(model_id)
+                    response_data = load_portfolio(model_id, readonly=True)
                 else:
                     response_data = get_all_portfolios()
             
-            elif path == "/api/run_daily":
-                summary = run_daily_review()
-                response_data = {"status": "complete", "results": summary}
+            elif path == "/api/run_daily" or path == "/api/run_model":
+                if path == "/api/run_model":
+                    # One model's cycle, as the cron fan-out runs it on Vercel
+                    model_id = query_params.get("id", [None])[0]
+                    if model_id not in [model["id"] for model in MODELS]:
+                        self.send_error_json(400, {"error": f"Unknown model id: {model_id}"})
+                        return
+                    model_ids = [model_id]
+                else:
+                    model_ids = [model["id"] for model in MODELS]
+
+                # Every trigger goes through the same single-flight job, so a
+                # cycle never runs twice at once and submits duplicate orders
+                job = start_job(
+                    "run_daily", lambda progress: run_daily_review(progress, model_ids=model_ids), model_ids
+                )
+                if not set(model_ids) <= set(job["models"]):
+                    self.send_error_json(409, {"error": "Another cycle is running", "job": job})
+                    return
+                if query_params.get("mode", [None])[0] == "job":
+                    # Run the cycle in the background; poll /api/run_status?id=<job_id>
+                    response_data = {"status": "started", "job_id": job["id"], "job": job}
+                else:
+                    job = wait_job(job["id"])
+                    if job["status"] == "error":
+                        raise RuntimeError(job["error"])
+                    response_data = {"status": "complete", "results": job["result"]}
+            
+            elif path == "/api/run_status":
+                job = get_job(query_params.get("id", [None])[0])
+                if job is None:
+                    self.send_error_json(404, {"error": "Job not found"})
+                    return
+                response_data = job
             
             else:
                 self.send_response(404)
@@ -55,11 +124,44 @@ class DevHandler(BaseHTTPRequestHandler):
             return
         
         # Success response
-        self.send_response(200)
+        send_json(self, response_data)
+
+    def send_error_json(self, status, data):
+        self.send_response(status)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(response_data, default=str).encode('utf-8'))
+        self.wfile.write(json.dumps(data, default=str).encode('utf-8'))
+
+    def stream_events(self, query_params):
+        """Server-Sent Events feed of cycle events; resumes from Last-Event-ID or ?since=."""
+        last_id = self.headers.get('Last-Event-ID') or query_params.get("since", [None])[0] or None
+        if last_id is not None:
+            try:
+                last_id = int(last_id)
+            except ValueError:
+                self.send_error_json(400, {"error": f"Invalid event id: {last_id!r}"})
+                return
+        events = subscribe(last_id)
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            while True:
+                try:
+                    event = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                self.wfile.write(format_sse(event))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away
+        finally:
+            unsubscribe(events)
 
     def do_OPTIONS(self):
         self.send_response(200)
@@ -69,6 +171,7 @@ class DevHandler(BaseHTTPRequestHandler):
         self.end_headers()
 
 print(f"Starting Python API server on port {PORT}...")
-httpd = HTTPServer(('localhost', PORT), DevHandler)
+# Threaded so portfolio reads are served while a cycle job is running
+httpd = ThreadingHTTPServer(('localhost', PORT), DevHandler)
 httpd.serve_forever()
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script to keep serverless cold starts cheap.
+
+Imports each entry point in a fresh interpreter and fails if the import goes
+over its time budget or pulls in a heavy dependency (yfinance, pandas,
+alpaca-py, openai...) that only the trading cycle needs. Budgets can be
+raised on slow machines with IMPORT_BUDGET_MS.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Read endpoints (/api/portfolios and the modules its handler imports)
+READ_PATH_MODULES = [
+    "api.portfolios", "api.utils.portfolio", "api.utils.leaderboard", "api.utils.responses"
+]
+READ_PATH_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "50"))
+
+# Modules that must not be imported until a handler actually needs them
+HEAVY_MODULES = [
+    "yfinance", "pandas", "numpy", "requests", "alpaca", "openai", "dotenv", "multiprocessing"
+]
+
+# Runs in the child. http.server is imported before timing starts because the
+# Vercel runtime has already loaded it by the time it imports the handler.
+MEASURE = """
+import http.server, json, sys, time
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({"ms": elapsed_ms, "modules": sorted(sys.modules)}))
+"""
+
+RUNS = 3
+
+def measure_import(modules: list):
+    """
+    Cold-import `modules` in fresh interpreters.
+
+    Returns:
+        (fastest import time in ms, top-level packages that were loaded)
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    loaded = set()
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", MEASURE, *modules],
+            cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = result["ms"] if best is None else min(best, result["ms"])
+        loaded = {name.split(".")[0] for name in result["modules"]}
+    return best, loaded
+
+def test_read_path_import_time():
+    """Read endpoints import within budget and without heavy dependencies."""
+    print("=" * 60)
+    print("Testing read endpoint import time")
+    print("=" * 60)
+
+    elapsed_ms, loaded = measure_import(READ_PATH_MODULES)
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    print(f"Cold import: {elapsed_ms:.1f} ms (budget {READ_PATH_BUDGET_MS:.0f} ms)")
+    if heavy:
+        print(f"❌ Heavy modules imported: {', '.join(heavy)}")
+    assert not heavy, f"read path imports {heavy}"
+    assert elapsed_ms <= READ_PATH_BUDGET_MS, f"read path import took {elapsed_ms:.1f} ms"
+    print("✅ Within budget")
+
+def test_cycle_entry_point_is_lazy():
+    """Importing api.run_daily defers the research, broker and LLM clients."""
+    print("=" * 60)
+    print("Testing api.run_daily import")
+    print("=" * 60)
+
+    elapsed_ms, loaded = measure_import(["api.run_daily"])
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    print(f"Cold import: {elapsed_ms:.1f} ms")
+    if heavy:
+        print(f"❌ Heavy modules imported: {', '.join(heavy)}")
+    assert not heavy, f"api.run_daily imports {heavy}"
+    print("✅ No heavy modules at import time")
+
+if __name__ == "__main__":
+    failed = False
+    for test in (test_read_path_import_time, test_cycle_entry_point_is_lazy):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"❌ {e}")
+            failed = True
+        print()
+    sys.exit(1 if failed else 0)
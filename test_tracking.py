@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
 Test script to verify portfolio tracking system works correctly.
+Run with BROKER=sim to use the offline simulated broker instead of Alpaca.
 """
 
 import os
@@ -19,8 +20,7 @@ def test_tracking():
     # Test imports
     try:
         from api.utils.portfolio import load_portfolio, save_portfolio, log_trade, update_nav, calculate_nav_from_positions
-        from api.utils.alpaca import execute_trade, get_alpaca_portfolio
-        from api.utils.research import get_price
+        from api.utils.broker import execute_trade, get_alpaca_portfolio, get_reference_quotes
         print("✅ All imports successful")
     except Exception as e:
         print(f"❌ Import error: {e}")
@@ -50,11 +50,11 @@ def test_tracking():
     # Test 3: Test price lookup
     print("\n3. Testing price lookup...")
     try:
-        price_data = get_price("AAPL")
-        if "error" in price_data:
-            print(f"   ❌ Price lookup error: {price_data['error']}")
+        price_data = get_reference_quotes(["AAPL"])["AAPL"]
+        if not price_data.get("price"):
+            print(f"   ❌ Price lookup error: no quote for AAPL")
             return False
-        print(f"   ✅ AAPL price: ${price_data.get('price', 0):.2f}")
+        print(f"   ✅ AAPL price: ${price_data['price']:.2f} ({price_data['source']})")
     except Exception as e:
         print(f"   ❌ Price lookup failed: {e}")
         return False
@@ -71,8 +71,8 @@ def test_tracking():
         }
         
         # Get current price
-        price_data = get_price("AAPL")
-        current_price = price_data.get("price", 150)
+        price_data = get_reference_quotes(["AAPL"])["AAPL"]
+        current_price = price_data.get("price") or 150
         
         # Simulate trade result
         trade_result = {